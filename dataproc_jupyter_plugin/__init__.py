@@ -21,7 +21,13 @@ from kernels_mixer.kernels import MixingMappingKernelManager
 from kernels_mixer.kernelspecs import MixingKernelSpecManager
 from kernels_mixer.websockets import DelegatingWebsocketConnection
 
+from .commons import http_session
+from .credentials import login
 from .handlers import DataprocPluginConfig, configure_gateway_client_url, setup_handlers
+from .services.bigquery import metadata_cache
+from .services.dataproc import watcher
+from .services.inventory import inventory
+from .services.search_index import search_index
 
 # In seconds
 MIN_GATEWAY_REQUEST_TIMEOUT = 600
@@ -127,6 +133,21 @@ def _link_jupyter_server_extension(server_app):
     c.GatewayClient.auth_token = "Initial, invalid value"
 
 
+# Module-based server extensions do not get a stop hook from the extension
+# manager, so we chain our cleanup onto the server's own extension cleanup.
+def _add_shutdown_hook(server_app, hook):
+    cleanup_extensions = server_app.cleanup_extensions
+
+    async def _cleanup_extensions():
+        try:
+            await hook()
+        except Exception as e:
+            server_app.log.warning(f"Error during Dataproc plugin shutdown: {e}")
+        await cleanup_extensions()
+
+    server_app.cleanup_extensions = _cleanup_extensions
+
+
 def _load_jupyter_server_extension(server_app):
     """Registers the API handler to receive HTTP requests from the frontend extension.
 
@@ -135,6 +156,23 @@ def _load_jupyter_server_extension(server_app):
     server_app: jupyterlab.labapp.LabApp
         JupyterLab application instance
     """
+    plugin_config = DataprocPluginConfig.instance(parent=server_app)
+    http_session.manager.configure(
+        pool_size=plugin_config.http_pool_size,
+        pool_size_per_host=plugin_config.http_pool_size_per_host,
+        connect_timeout=plugin_config.http_connect_timeout,
+        request_timeout=plugin_config.http_request_timeout,
+    )
+    _add_shutdown_hook(server_app, http_session.manager.close)
+    _add_shutdown_hook(server_app, watcher.close)
+    _add_shutdown_hook(server_app, login.close)
+    search_index.configure(plugin_config.enable_bigquery_search_index)
+    inventory.configure(plugin_config.persist_dataproc_inventory)
+    metadata_cache.configure_prefetch(
+        plugin_config.bigquery_prefetch_depth,
+        plugin_config.bigquery_prefetch_memory_budget,
+    )
+
     setup_handlers(server_app.web_app)
     name = "dataproc_jupyter_plugin"
     server_app.log.info(f"Registered {name} server extension")
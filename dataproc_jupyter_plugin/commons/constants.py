@@ -64,8 +64,120 @@ PROJECT_REGEXP = re.compile("^[a-z0-9.:-]+$")
 # Region pattern: standard GCP region format
 REGION_REGEXP = re.compile("^[a-z]+-[a-z]+\d+$")
 
-# Big Query Client Duration (seconds)
-BQ_CLIENT_EXPIRY_DURATION = 60 * 60  # 1 hour
+# Shared HTTP connection pool defaults
+HTTP_CONNECTION_LIMIT = 100
+HTTP_CONNECTION_LIMIT_PER_HOST = 20
+HTTP_KEEPALIVE_TIMEOUT = 60  # seconds
+HTTP_DNS_CACHE_TTL = 5 * 60  # seconds
+HTTP_CONNECT_TIMEOUT = 30  # seconds
+HTTP_REQUEST_TIMEOUT = 5 * 60  # seconds
 
 # Page Size limit for Dataset explorer
-PAGE_SIZE_LIMIT = 400
\ No newline at end of file
+PAGE_SIZE_LIMIT = 400
+
+# Page Size for Dataplex catalog search
+SEARCH_PAGE_SIZE = 500
+
+# Dataset explorer metadata cache: max number of cached responses and their TTL
+METADATA_CACHE_MAX_ENTRIES = 2000
+METADATA_CACHE_TTL = 5 * 60  # 5 minutes
+
+# Dataset explorer prefetch: pages fetched ahead of the one served, and the
+# maximum size of prefetched pages not yet requested (bytes)
+PREFETCH_DEPTH = 1
+PREFETCH_MEMORY_BUDGET = 16 * 1024 * 1024  # 16 MiB
+
+# Dataproc resource listings: page size and max items listed per resource kind
+DATAPROC_LIST_PAGE_SIZE = 100
+DATAPROC_LIST_MAX_ITEMS = 500
+
+# Dataproc resource watcher: base poll interval, events queued per subscriber, and
+# how often an idle event stream sends a keepalive comment (seconds)
+DATAPROC_WATCH_INTERVAL = 10
+DATAPROC_WATCH_QUEUE_SIZE = 100
+DATAPROC_WATCH_KEEPALIVE = 15
+
+# Adaptive watch polling: interval for a resource kind with resources in a
+# transitional state, and the cap an unchanged kind backs off to (seconds)
+DATAPROC_WATCH_FAST_INTERVAL = 2
+DATAPROC_WATCH_MAX_INTERVAL = 60
+
+# Server-side batch listing: batches kept per project and region, how long a
+# sync is reused, and how often the whole listing is refetched (seconds)
+DATAPROC_BATCH_STORE_MAX = 1000
+DATAPROC_BATCH_SYNC_INTERVAL = 5
+DATAPROC_BATCH_FULL_SYNC_INTERVAL = 10 * 60
+
+# Bulk job listing: jobs listed per cluster, and clusters listed at once
+DATAPROC_JOBS_MAX_PER_CLUSTER = 500
+DATAPROC_JOBS_CONCURRENCY = 8
+
+# Persisted Dataproc inventory: projects and regions kept, and how long
+# changes are batched before the file is rewritten (seconds)
+DATAPROC_INVENTORY_MAX_LOCATIONS = 10
+DATAPROC_INVENTORY_SAVE_DELAY = 5
+
+# Retries of transient upstream errors: attempts per request, and the
+# backoff base and cap (seconds); a longer Retry-After is not waited for
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 10
+
+# Retry budget: each request earns this fraction of a retry, up to a maximum
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_MAX = 10
+
+# Per-host rate limit for upstream requests (requests per second, burst size)
+RETRY_RATE_LIMIT = 50
+RETRY_RATE_LIMIT_BURST = 100
+
+# Bulk table info: max tables per request and concurrent upstream calls
+BULK_TABLE_INFO_MAX_TABLES = 1000
+BULK_TABLE_INFO_CONCURRENCY = 8
+
+# Table preview row cache: max number of tables and of cached rows per table
+PREVIEW_CACHE_MAX_TABLES = 50
+PREVIEW_CACHE_MAX_ROWS_PER_TABLE = 5000
+
+# Chunk size used when streaming upstream responses through to the client (bytes)
+STREAM_CHUNK_SIZE = 64 * 1024  # 64 KiB
+
+# Minimum preview response size to gzip when the client accepts it (bytes)
+GZIP_MIN_SIZE = 1024
+
+# Compression level for gzipped responses
+GZIP_LEVEL = 5
+
+# Local BigQuery search index: entries not refreshed within this are dropped (seconds)
+SEARCH_INDEX_TTL = 24 * 60 * 60  # 1 day
+
+# Local BigQuery search index: how often expired entries are pruned (seconds)
+SEARCH_INDEX_PRUNE_INTERVAL = 60 * 60  # 1 hour
+
+# Credentials cache: refresh this long before the access token expires (seconds)
+CREDENTIALS_REFRESH_MARGIN = 5 * 60  # 5 minutes
+
+# Credentials cache: stop serving a token this long before it expires (seconds)
+CREDENTIALS_EXPIRY_MARGIN = 60  # 1 minute
+
+# Credentials cache: upper bound on how long a result is served (seconds),
+# matching the gcloud config cache so project/region changes are picked up
+CREDENTIALS_MAX_TTL = 20 * 60  # 20 minutes
+
+# Service URL map cache duration (seconds), matching the gcloud config cache
+SERVICE_URL_CACHE_TTL = 20 * 60  # 20 minutes
+
+# Latest package version cache duration (seconds) before revalidating with PyPI
+VERSION_CACHE_TTL = 60 * 60  # 1 hour
+
+# Number of finished plugin upgrade jobs whose status and output are kept
+UPGRADE_JOB_HISTORY_LIMIT = 10
+
+# Maximum time to wait for the user to complete `gcloud auth login` (seconds)
+LOGIN_TIMEOUT = 10 * 60  # 10 minutes
+
+# Enabled GCP services cache duration per project (seconds)
+ENABLED_SERVICES_CACHE_TTL = 10 * 60  # 10 minutes
+
+# Re-read a cached enabled services list this old when a service is missing
+ENABLED_SERVICES_RECHECK_INTERVAL = 30  # seconds
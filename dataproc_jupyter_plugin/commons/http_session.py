@@ -0,0 +1,71 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import aiohttp
+
+from dataproc_jupyter_plugin.commons.constants import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_CONNECTION_LIMIT,
+    HTTP_CONNECTION_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_REQUEST_TIMEOUT,
+)
+
+
+class HttpSessionManager:
+    """Owns the aiohttp session shared by all of the plugin's services.
+
+    The session is created lazily on first use (it must be created inside the
+    running event loop) and closed when the Jupyter server shuts down.
+    """
+
+    def __init__(self):
+        self._session = None
+        self.configure()
+
+    def configure(
+        self,
+        pool_size=HTTP_CONNECTION_LIMIT,
+        pool_size_per_host=HTTP_CONNECTION_LIMIT_PER_HOST,
+        connect_timeout=HTTP_CONNECT_TIMEOUT,
+        request_timeout=HTTP_REQUEST_TIMEOUT,
+    ):
+        """Sets the pool and timeout settings used for the next session."""
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+
+    def get(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size_per_host,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.request_timeout, connect=self.connect_timeout
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+manager = HttpSessionManager()
@@ -0,0 +1,228 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import datetime
+import email.utils
+import random
+import time
+import urllib.parse
+
+import aiohttp
+
+from dataproc_jupyter_plugin.commons.constants import (
+    RETRY_BASE_DELAY,
+    RETRY_BUDGET_MAX,
+    RETRY_BUDGET_RATIO,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY,
+    RETRY_RATE_LIMIT,
+    RETRY_RATE_LIMIT_BURST,
+)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Path segments followed by a resource ID, which metrics labels leave out.
+_COLLECTIONS = {
+    "projects", "datasets", "tables", "locations", "entryGroups", "entries",
+    "regions", "clusters", "batches", "sessions", "jobs", "sessionTemplates",
+}
+
+
+class RetryableError(Exception):
+    """An upstream error worth retrying, with the server's `Retry-After` if any."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Returns the delay in seconds of a `Retry-After` header, or None."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max((date - now).total_seconds(), 0.0)
+
+
+async def raise_for_status(response, error_message, expected=200):
+    """Raises for an unexpected status; `RetryableError` for transient ones."""
+    if response.status == expected:
+        return
+    message = f"{error_message}: {response.reason} {await response.text()}"
+    if response.status in RETRYABLE_STATUSES:
+        raise RetryableError(
+            message, parse_retry_after(response.headers.get("Retry-After"))
+        )
+    raise Exception(message)
+
+
+def endpoint_label(url):
+    """Names an endpoint for metrics: its host and path without resource IDs."""
+    parsed = urllib.parse.urlsplit(url)
+    segments = parsed.path.strip("/").split("/")
+    label = []
+    for index, segment in enumerate(segments):
+        if index and segments[index - 1] in _COLLECTIONS:
+            segment = "*"
+        label.append(segment)
+    return f"{parsed.netloc}/{'/'.join(label)}"
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, in bursts of `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RetryPolicy:
+    """Retry, backoff and rate limiting shared by the plugin's API clients.
+
+    Transient failures (429, 5xx, connection errors and timeouts) are retried
+    up to `max_attempts` times with exponential backoff and full jitter, or
+    after the server's `Retry-After` when it gives one. A `Retry-After` longer
+    than `max_delay` is not waited for. Retries draw from a budget that every
+    first attempt refills by `budget_ratio`, so a failing backend sees at
+    most that fraction of extra load. Requests to each host go through a
+    token bucket. Latency and retry counts are kept per endpoint.
+    """
+
+    def __init__(
+        self,
+        max_attempts=RETRY_MAX_ATTEMPTS,
+        base_delay=RETRY_BASE_DELAY,
+        max_delay=RETRY_MAX_DELAY,
+        budget_ratio=RETRY_BUDGET_RATIO,
+        budget_max=RETRY_BUDGET_MAX,
+        rate_limit=RETRY_RATE_LIMIT,
+        rate_limit_burst=RETRY_RATE_LIMIT_BURST,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+        self.rate_limit = rate_limit
+        self.rate_limit_burst = rate_limit_burst
+        self._budget = budget_max
+        self._buckets = {}
+        self._metrics = {}
+
+    async def acquire(self, url, attempt):
+        """Waits for the host's rate limiter before an attempt."""
+        if attempt == 1:
+            self._budget = min(self.budget_max, self._budget + self.budget_ratio)
+        host = urllib.parse.urlsplit(url).netloc
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(
+                self.rate_limit, self.rate_limit_burst
+            )
+        await bucket.acquire()
+
+    def retry_delay(self, attempt, error):
+        """Returns how long to wait before retrying `error`, or None to give up."""
+        if attempt >= self.max_attempts or self._budget < 1:
+            return None
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                return None
+            delay = retry_after
+        else:
+            delay = random.uniform(
+                0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+            )
+        self._budget -= 1
+        return delay
+
+    def record(self, url, started, attempts, failed):
+        metrics = self._metrics.setdefault(
+            endpoint_label(url),
+            {"requests": 0, "retries": 0, "failures": 0, "latency_total": 0.0, "latency_max": 0.0},
+        )
+        latency = time.monotonic() - started
+        metrics["requests"] += 1
+        metrics["retries"] += attempts - 1
+        metrics["failures"] += int(failed)
+        metrics["latency_total"] += latency
+        metrics["latency_max"] = max(metrics["latency_max"], latency)
+
+    async def run(self, url, send):
+        """Calls `send()` for `url` until it succeeds or retrying gives up.
+
+        `send()` performs one attempt and raises `RetryableError` (see
+        `raise_for_status`) for failures worth retrying.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            await self.acquire(url, attempt)
+            try:
+                result = await send()
+            except (RetryableError, aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = self.retry_delay(attempt, e)
+                if delay is None:
+                    self.record(url, started, attempt, True)
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                self.record(url, started, attempt, True)
+                raise
+            self.record(url, started, attempt, False)
+            return result
+
+    def stats(self):
+        return {
+            "retry_budget": self._budget,
+            "endpoints": {
+                label: {
+                    "requests": metrics["requests"],
+                    "retries": metrics["retries"],
+                    "failures": metrics["failures"],
+                    "latency_avg": metrics["latency_total"] / metrics["requests"],
+                    "latency_max": metrics["latency_max"],
+                }
+                for label, metrics in self._metrics.items()
+            },
+        }
+
+
+policy = RetryPolicy()
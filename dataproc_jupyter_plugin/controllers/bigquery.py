@@ -13,42 +13,139 @@
 # limitations under the License.
 
 
+import base64
+import gzip
 import json
-import time
 import asyncio
+import zlib
 
-import aiohttp
 import tornado
 from jupyter_server.base.handlers import APIHandler
 from dataproc_jupyter_plugin import credentials
+from dataproc_jupyter_plugin.commons import http_session, retry
 from dataproc_jupyter_plugin.services import bigquery
+from dataproc_jupyter_plugin.services.search_index import search_index
 
 from dataproc_jupyter_plugin.commons.constants import (
-    BQ_PUBLIC_DATASET_PROJECT_ID,BQ_CLIENT_EXPIRY_DURATION
+    BQ_PUBLIC_DATASET_PROJECT_ID,
+    BULK_TABLE_INFO_CONCURRENCY,
+    BULK_TABLE_INFO_MAX_TABLES,
+    GZIP_LEVEL,
+    GZIP_MIN_SIZE,
 )
-    
+
+
 class BigQueryClient:
+    """Holds a long-lived BigQuery client on the shared HTTP session.
+
+    The client is created once and kept so that warm connections are
+    reused; when the cached credentials are refreshed only the bearer
+    token on the client is swapped.
+    """
+
     _client = None
-    _session = None
-    _creation_time = None
     _lock = asyncio.Lock()
-	
+
     async def get_client(self, log):
-        async with self._lock:
-            if self._client is None or (time.time() - self._creation_time) > BQ_CLIENT_EXPIRY_DURATION:
-                if self._session:
-                    await self._session.close()
-
-                self._session = aiohttp.ClientSession()
-                self._client = bigquery.Client(
-                    await credentials.get_cached(), log, self._session
-                )
-                self._creation_time = time.time()
-            return self._client
+        cached = await credentials.get_cached()
+        if cached.get("login_error") or not cached.get("access_token"):
+            # Never keep the token of a failed login on the shared client;
+            # the next request reads gcloud again.
+            raise ValueError("Not logged in to gcloud")
+        client = self._client
+        if client is None or client.client_session.closed:
+            async with self._lock:
+                if self._client is None or self._client.client_session.closed:
+                    self._client = bigquery.Client(
+                        cached, log, http_session.manager.get()
+                    )
+                    await self._client.resolve_service_urls()
+                return self._client
+
+        if (
+            client._access_token != cached["access_token"]
+            or client.project_id != cached["project_id"]
+            or client.region_id != cached["region_id"]
+        ):
+            client.update_credentials(cached)
+        return client
 
 bigquery_client = BigQueryClient()
 
-class DatasetController(APIHandler):
+def _cache_status(hit):
+    """Formats a `Cache-Status` header value (RFC 9211)."""
+    return "dataproc-plugin; hit" if hit else "dataproc-plugin; fwd=miss"
+
+
+class ProxyHandler(APIHandler):
+    """Base class for handlers that return BigQuery responses.
+
+    With `passthrough=true` the upstream body is streamed to the client as it
+    arrives instead of being parsed and re-encoded; such requests bypass the
+    server-side caches.
+    """
+
+    def passthrough_requested(self):
+        return self.get_argument("passthrough", default="false").lower() == "true"
+
+    def accepts_gzip(self):
+        return "gzip" in self.request.headers.get("Accept-Encoding", "")
+
+    async def stream_upstream(self, chunks):
+        """Writes the chunks yielded by `bigquery.Client.stream` as they arrive.
+
+        The body is gzipped on the fly when the client accepts it. Errors
+        before the first chunk propagate to the caller; later ones can only
+        cut the response short.
+        """
+        compressor = None
+        self.set_header("Content-Type", "application/json")
+        if self.accepts_gzip():
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.set_header("Content-Encoding", "gzip")
+            self.set_header("Vary", "Accept-Encoding")
+        written = False
+        try:
+            async for chunk in chunks:
+                if compressor:
+                    chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                self.write(chunk)
+                written = True
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            self.log.info("Client disconnected, stopping passthrough")
+            return
+        except Exception:
+            if not written:
+                self.clear_header("Content-Encoding")
+                raise
+            self.log.exception("Error streaming upstream response")
+        finally:
+            await chunks.aclose()
+        if compressor:
+            self.write(compressor.flush())
+        self.finish()
+
+    def finish_compressed(self, body):
+        if self.accepts_gzip() and len(body) >= GZIP_MIN_SIZE:
+            self.set_header("Content-Encoding", "gzip")
+            self.set_header("Vary", "Accept-Encoding")
+            self.finish(gzip.compress(body.encode("utf-8"), compresslevel=GZIP_LEVEL))
+        else:
+            self.finish(body)
+
+
+class MetadataHandler(ProxyHandler):
+    """Base class for dataset explorer handlers served through the metadata cache."""
+
+    async def get_cached(self, key, fetch):
+        refresh = self.get_argument("refresh", default="false").lower() == "true"
+        value, hit = await bigquery.metadata_cache.get_or_fetch(key, fetch, refresh)
+        self.set_header("Cache-Status", _cache_status(hit))
+        return value
+
+
+class DatasetController(MetadataHandler):
     @tornado.web.authenticated
     async def get(self):
         try:
@@ -56,14 +153,115 @@ class DatasetController(APIHandler):
             project_id = self.get_argument("project_id")
             location = self.get_argument("location", default="us").lower()
             bq_client = await bigquery_client.get_client(self.log)
-            dataset_list = await bq_client.list_datasets(page_token, project_id, location)
+            if self.passthrough_requested():
+                await self.stream_upstream(
+                    bq_client.stream(
+                        await bq_client.datasets_endpoint(page_token, project_id, location),
+                        "Error response from BigQuery",
+                    )
+                )
+                return
+            dataset_list = await self.get_cached(
+                bigquery.MetadataCache.key(
+                    "datasets", project_id, location, page_token=page_token
+                ),
+                lambda: bq_client.list_datasets(page_token, project_id, location),
+            )
             self.finish(json.dumps(dataset_list))
+            search_index.add_datasets(dataset_list)
+            bigquery.metadata_cache.prefetch_pages(
+                dataset_list,
+                lambda token: (
+                    bigquery.MetadataCache.key(
+                        "datasets", project_id, location, page_token=token
+                    ),
+                    lambda: bq_client.list_datasets(token, project_id, location),
+                ),
+            )
+        except Exception as e:
+            self.log.exception("Error fetching datasets")
+            self.finish({"error": str(e)})
+
+
+def encode_cursor(location, page_tokens):
+    """Packs the page token of every project with more datasets into one cursor."""
+    if not page_tokens:
+        return None
+    state = json.dumps({"location": location, "pageTokens": page_tokens})
+    return base64.urlsafe_b64encode(state.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, location):
+    """Returns the `{project_id: page_token}` map of a cursor from `encode_cursor`."""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        page_tokens = state["pageTokens"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    if state.get("location") != location or not isinstance(page_tokens, dict):
+        raise ValueError("Invalid cursor")
+    return page_tokens
+
+
+class AllDatasetsController(MetadataHandler):
+    @tornado.web.authenticated
+    async def get(self):
+        """Lists the datasets of every project from `bq_projects_list` at once.
+
+        One page per project is fetched concurrently through the metadata
+        cache. The response maps each project to its page (or error) and
+        carries a `nextCursor` to pass back as `cursor` for the following
+        pages, absent once every project is exhausted.
+        """
+        try:
+            location = self.get_argument("location", default="us").lower()
+            cursor = self.get_argument("cursor", default=None)
+            if cursor:
+                try:
+                    page_tokens = decode_cursor(cursor, location)
+                except ValueError as e:
+                    self.set_status(400)
+                    self.finish({"error": str(e)})
+                    return
+            else:
+                page_tokens = {project_id: "" for project_id in await bq_projects_list()}
+            bq_client = await bigquery_client.get_client(self.log)
+            refresh = self.get_argument("refresh", default="false").lower() == "true"
+
+            async def list_page(project_id, page_token):
+                return await bigquery.metadata_cache.get_or_fetch(
+                    bigquery.MetadataCache.key(
+                        "datasets", project_id, location, page_token=page_token
+                    ),
+                    lambda: bq_client.list_datasets(page_token, project_id, location),
+                    refresh,
+                )
+
+            pages = await asyncio.gather(
+                *[list_page(project_id, token) for project_id, token in page_tokens.items()]
+            )
+            projects = {}
+            next_tokens = {}
+            for project_id, (page, _) in zip(page_tokens, pages):
+                projects[project_id] = page
+                if "error" not in page:
+                    search_index.add_datasets(page)
+                    if page.get("nextPageToken"):
+                        next_tokens[project_id] = page["nextPageToken"]
+            self.set_header(
+                "Cache-Status", _cache_status(all(hit for _, hit in pages))
+            )
+            result = {"projects": projects}
+            next_cursor = encode_cursor(location, next_tokens)
+            if next_cursor:
+                result["nextCursor"] = next_cursor
+            self.finish_compressed(json.dumps(result))
         except Exception as e:
             self.log.exception("Error fetching datasets")
             self.finish({"error": str(e)})
 
 
-class TableController(APIHandler):
+class TableController(MetadataHandler):
     @tornado.web.authenticated
     async def get(self):
         try:
@@ -71,28 +269,64 @@ class TableController(APIHandler):
             dataset_id = self.get_argument("dataset_id")
             project_id = self.get_argument("project_id")
             bq_client = await bigquery_client.get_client(self.log)
-            table_list = await bq_client.list_table(dataset_id, page_token, project_id)
+            if self.passthrough_requested():
+                await self.stream_upstream(
+                    bq_client.stream(
+                        await bq_client.tables_endpoint(dataset_id, page_token, project_id),
+                        "Error listing BigQuery tables",
+                    )
+                )
+                return
+            table_list = await self.get_cached(
+                bigquery.MetadataCache.key(
+                    "tables", project_id, dataset_id=dataset_id, page_token=page_token
+                ),
+                lambda: bq_client.list_table(dataset_id, page_token, project_id),
+            )
             self.finish(json.dumps(table_list))
+            search_index.add_tables(table_list)
+            bigquery.metadata_cache.prefetch_pages(
+                table_list,
+                lambda token: (
+                    bigquery.MetadataCache.key(
+                        "tables", project_id, dataset_id=dataset_id, page_token=token
+                    ),
+                    lambda: bq_client.list_table(dataset_id, token, project_id),
+                ),
+            )
         except Exception as e:
             self.log.exception("Error fetching datasets")
             self.finish({"error": str(e)})
 
 
-class DatasetInfoController(APIHandler):
+class DatasetInfoController(MetadataHandler):
     @tornado.web.authenticated
     async def get(self):
         try:
             dataset_id = self.get_argument("dataset_id")
             project_id = self.get_argument("project_id")
             bq_client = await bigquery_client.get_client(self.log)
-            dataset_info = await bq_client.list_dataset_info(dataset_id, project_id)
+            if self.passthrough_requested():
+                await self.stream_upstream(
+                    bq_client.stream(
+                        await bq_client.dataset_info_endpoint(dataset_id, project_id),
+                        "Error listing BigQuery dataset info",
+                    )
+                )
+                return
+            dataset_info = await self.get_cached(
+                bigquery.MetadataCache.key(
+                    "dataset_info", project_id, dataset_id=dataset_id
+                ),
+                lambda: bq_client.list_dataset_info(dataset_id, project_id),
+            )
             self.finish(json.dumps(dataset_info))
         except Exception as e:
             self.log.exception("Error fetching dataset information")
             self.finish({"error": str(e)})
 
 
-class TableInfoController(APIHandler):
+class TableInfoController(MetadataHandler):
     @tornado.web.authenticated
     async def get(self):
         try:
@@ -100,8 +334,19 @@ class TableInfoController(APIHandler):
             table_id = self.get_argument("table_id")
             project_id = self.get_argument("project_id")
             bq_client = await bigquery_client.get_client(self.log)
-            table_info = await bq_client.list_table_info(
-                dataset_id, table_id, project_id
+            if self.passthrough_requested():
+                await self.stream_upstream(
+                    bq_client.stream(
+                        await bq_client.table_info_endpoint(dataset_id, table_id, project_id),
+                        "Error listing BigQuery table info",
+                    )
+                )
+                return
+            table_info = await self.get_cached(
+                bigquery.MetadataCache.key(
+                    "table_info", project_id, dataset_id=dataset_id, table_id=table_id
+                ),
+                lambda: bq_client.list_table_info(dataset_id, table_id, project_id),
             )
             self.finish(json.dumps(table_info))
         except Exception as e:
@@ -109,7 +354,87 @@ class TableInfoController(APIHandler):
             self.finish({"error": str(e)})
 
 
-class PreviewController(APIHandler):
+class BulkTableInfoController(MetadataHandler):
+    @tornado.web.authenticated
+    async def post(self):
+        """Returns the metadata of several tables in one request.
+
+        The body is `{"tables": [{"project_id", "dataset_id", "table_id"}, ...]}`.
+        Tables are fetched through the metadata cache, at most
+        `BULK_TABLE_INFO_CONCURRENCY` at a time, and returned in request order
+        with either an `info` or an `error` field each.
+        """
+        try:
+            tables = (self.get_json_body() or {}).get("tables", [])
+            if len(tables) > BULK_TABLE_INFO_MAX_TABLES:
+                self.set_status(400)
+                self.finish(
+                    {"error": f"At most {BULK_TABLE_INFO_MAX_TABLES} tables per request"}
+                )
+                return
+            bq_client = await bigquery_client.get_client(self.log)
+            semaphore = asyncio.Semaphore(BULK_TABLE_INFO_CONCURRENCY)
+
+            async def table_info(table):
+                result = {
+                    "project_id": table.get("project_id"),
+                    "dataset_id": table.get("dataset_id"),
+                    "table_id": table.get("table_id"),
+                }
+                if not all(result.values()):
+                    result["error"] = "project_id, dataset_id and table_id are required"
+                    return result
+                async with semaphore:
+                    info, _ = await bigquery.metadata_cache.get_or_fetch(
+                        bigquery.MetadataCache.key(
+                            "table_info",
+                            result["project_id"],
+                            dataset_id=result["dataset_id"],
+                            table_id=result["table_id"],
+                        ),
+                        lambda: bq_client.list_table_info(
+                            result["dataset_id"], result["table_id"], result["project_id"]
+                        ),
+                    )
+                if "error" in info:
+                    result["error"] = info["error"]
+                else:
+                    result["info"] = info
+                return result
+
+            results = await asyncio.gather(*[table_info(table) for table in tables])
+            self.finish_compressed(json.dumps({"tables": results}))
+        except Exception as e:
+            self.log.exception("Error fetching table information")
+            self.finish({"error": str(e)})
+
+
+class CacheController(APIHandler):
+    @tornado.web.authenticated
+    async def get(self):
+        stats = bigquery.metadata_cache.stats()
+        stats["preview"] = bigquery.preview_cache.stats()
+        client = bigquery_client._client
+        stats["requests"] = (
+            client.stats() if client else {"upstream_calls": 0, "coalesced_calls": 0}
+        )
+        stats["upstream"] = retry.policy.stats()
+        self.finish(json.dumps(stats))
+
+    @tornado.web.authenticated
+    async def delete(self):
+        try:
+            project_id = self.get_argument("project_id", default=None)
+            dataset_id = self.get_argument("dataset_id", default=None)
+            bigquery.metadata_cache.invalidate(project_id, dataset_id)
+            bigquery.preview_cache.invalidate(project_id, dataset_id)
+            self.finish({"status": "OK"})
+        except Exception as e:
+            self.log.exception("Error invalidating cache")
+            self.finish({"error": str(e)})
+
+
+class PreviewController(ProxyHandler):
     @tornado.web.authenticated
     async def get(self):
         try:
@@ -118,11 +443,39 @@ class PreviewController(APIHandler):
             max_results = self.get_argument("max_results")
             start_index = self.get_argument("start_index")
             project_id = self.get_argument("project_id")
+            selected_fields = self.get_argument("selected_fields", default=None)
+            columnar = self.get_argument("format", default="rows") == "columnar"
             bq_client = await bigquery_client.get_client(self.log)
+            if self.passthrough_requested() and not columnar:
+                await self.stream_upstream(
+                    bq_client.stream(
+                        await bq_client.preview_data_endpoint(
+                            dataset_id, table_id, max_results, start_index,
+                            project_id, selected_fields,
+                        ),
+                        "Error displaying BigQuery preview data",
+                    )
+                )
+                return
             preview_data = await bq_client.bigquery_preview_data(
-                dataset_id, table_id, max_results, start_index, project_id
+                dataset_id, table_id, max_results, start_index, project_id, selected_fields
             )
-            self.finish(json.dumps(preview_data))
+            if columnar and "error" not in preview_data:
+                table_info, _ = await bigquery.metadata_cache.get_or_fetch(
+                    bigquery.MetadataCache.key(
+                        "table_info", project_id, dataset_id=dataset_id, table_id=table_id
+                    ),
+                    lambda: bq_client.list_table_info(dataset_id, table_id, project_id),
+                )
+                if "error" in table_info:
+                    preview_data = table_info
+                else:
+                    preview_data = bigquery.to_columnar(
+                        preview_data,
+                        table_info.get("schema", {}).get("fields", []),
+                        selected_fields,
+                    )
+            self.finish_compressed(json.dumps(preview_data))
         except Exception as e:
             self.log.exception("Error fetching preview data")
             self.finish({"error": str(e)})
@@ -147,19 +500,99 @@ class ProjectsController(APIHandler):
             self.finish({"error": str(e)})
 
 
+def _result_fqn(result):
+    return result.get("dataplexEntry", {}).get("fullyQualifiedName")
+
+
+def _new_results(results, seen):
+    """Drops results whose entry was already returned, recording the rest in `seen`."""
+    fresh = []
+    for result in results:
+        fqn = _result_fqn(result)
+        if fqn is None or fqn not in seen:
+            fresh.append(result)
+            seen.add(fqn)
+    return fresh
+
+
 class SearchController(APIHandler):
+    """Searches BigQuery entries, answering from the local search index first.
+
+    Local matches are returned at once, marked `partial` since the index only
+    covers what the user has already browsed; Dataplex is only searched when
+    the index has no match, or with `complete=true`, in which case its
+    results follow the local ones. With `stream=true` the local matches are
+    written first and Dataplex pages follow as they arrive.
+    """
+
     @tornado.web.authenticated
     async def post(self):
         try:
             search_string = self.get_argument("search_string")
             type = self.get_argument("type")
             system = self.get_argument("system")
+            max_results = self.get_argument("max_results", default=None)
+            max_results = int(max_results) if max_results else None
+            stream = self.get_argument("stream", default="false").lower() == "true"
+            complete = self.get_argument("complete", default="false").lower() == "true"
             projects = await bq_projects_list()
+            local_results = await search_index.search(
+                search_string, type, projects, max_results
+            )
+            if local_results and not (stream or complete):
+                self.finish(json.dumps({"results": local_results, "partial": True}))
+                return
             bq_client = await bigquery_client.get_client(self.log)
+            if stream:
+                await self._stream_search(
+                    bq_client, local_results,
+                    search_string, type, system, projects, max_results,
+                )
+                return
             search_data = await bq_client.bigquery_search(
-                search_string, type, system, projects
+                search_string, type, system, projects, max_results
             )
+            if local_results:
+                if "error" in search_data:
+                    self.log.warning(
+                        f"Serving local search results only: {search_data['error']}"
+                    )
+                seen = set()
+                results = _new_results(local_results, seen) + _new_results(
+                    search_data.get("results", []), seen
+                )
+                search_data = {"results": results[:max_results]}
             self.finish(json.dumps(search_data))
         except Exception as e:
             self.log.exception("Error fetching search data")
             self.finish({"error": str(e)})
+
+    async def _stream_search(self, bq_client, local_results, *search_args):
+        """Writes search results as newline-delimited JSON, one line per page.
+
+        Local index matches, if any, are written first; each Dataplex page is
+        then flushed as soon as it arrives, without the entries already sent.
+        A failure after the first page is reported as a final `{"error": ...}`
+        line.
+        """
+        self.set_header("Content-Type", "application/x-ndjson")
+        seen = set()
+        pages = bq_client.search_pages(*search_args)
+        try:
+            if local_results:
+                self.write(json.dumps({"results": _new_results(local_results, seen)}) + "\n")
+                await self.flush()
+            async for page in pages:
+                page = _new_results(page, seen)
+                if page:
+                    self.write(json.dumps({"results": page}) + "\n")
+                    await self.flush()
+        except tornado.iostream.StreamClosedError:
+            self.log.info("Search client disconnected, stopping search")
+            return
+        except Exception as e:
+            self.log.exception("Error streaming search data")
+            self.write(json.dumps({"error": str(e)}) + "\n")
+        finally:
+            await pages.aclose()
+        self.finish()
@@ -13,11 +13,69 @@
 # limitations under the License.
 
 
+import asyncio
+import json
+import time
+
 from jupyter_server.base.handlers import APIHandler
 import tornado
 from google.cloud.jupyter_config.config import async_run_gcloud_subcommand
 from dataproc_jupyter_plugin import credentials
 from dataproc_jupyter_plugin import urls
+from dataproc_jupyter_plugin.commons.constants import (
+    ENABLED_SERVICES_CACHE_TTL,
+    ENABLED_SERVICES_RECHECK_INTERVAL,
+)
+
+# Enabled services per project, as (fetch time, set of service domain names).
+_enabled_services = {}
+_pending_fetches = {}
+
+
+def clear_cache():
+    """Drops the cached enabled services, e.g. after the project changes."""
+    _enabled_services.clear()
+
+
+async def _fetch_enabled_services(project_id):
+    cmd = f'services list --enabled --project={project_id} --format="value(config.name)"'
+    result = await async_run_gcloud_subcommand(cmd)
+    services = {line.strip() for line in result.splitlines() if line.strip()}
+    _enabled_services[project_id] = (time.monotonic(), services)
+    return services
+
+
+async def enabled_services(project_id, required=()):
+    """Returns the set of services enabled for a project.
+
+    All services are listed with a single gcloud call and cached per project.
+    A service that is missing from a cached set older than
+    `ENABLED_SERVICES_RECHECK_INTERVAL` triggers a re-read, so that enabling
+    an API is picked up without waiting for the cache to expire. Concurrent
+    callers share one in-flight gcloud call.
+    """
+    cached = _enabled_services.get(project_id)
+    if cached:
+        age = time.monotonic() - cached[0]
+        if age < ENABLED_SERVICES_CACHE_TTL and (
+            age < ENABLED_SERVICES_RECHECK_INTERVAL
+            or all(name in cached[1] for name in required)
+        ):
+            return cached[1]
+
+    fetch = _pending_fetches.get(project_id)
+    if fetch is None:
+        fetch = asyncio.ensure_future(_fetch_enabled_services(project_id))
+        _pending_fetches[project_id] = fetch
+        fetch.add_done_callback(lambda _: _pending_fetches.pop(project_id, None))
+    return await asyncio.shield(fetch)
+
+
+async def _service_domain_name(service_name):
+    service_url = await urls.gcp_service_url(service_name)
+    # if service_url is https://service_name.googleapis.com/ , we should retrive only service_name.googleapis.com
+    return service_url.split('//')[-1].split('/')[0]
+
 
 class CheckApiController(APIHandler):
     @tornado.web.authenticated
@@ -26,9 +84,7 @@ class CheckApiController(APIHandler):
         Check if a specific GCP API service is enabled for the current project using gcloud.
         """
         service_name = self.get_argument("service_name")
-        service_url = await urls.gcp_service_url(service_name)
-        # if service_url is https://service_name.googleapis.com/ , we should retrive only service_name.googleapis.com
-        service_domain_name = service_url.split('//')[-1].split('/')[0]
+        service_domain_name = await _service_domain_name(service_name)
         if not service_domain_name:
             self.log.error(f"Service URL for {service_name} not found.")
             self.finish(
@@ -40,13 +96,45 @@ class CheckApiController(APIHandler):
             )
             return
         
-        project_id = await credentials._gcp_project()
+        project_id = (await credentials.get_cached())["project_id"]
 
         try:
-            cmd = f'services list --enabled --project={project_id} --filter="NAME={service_domain_name}"'
-            result = await async_run_gcloud_subcommand(cmd)
-            is_enabled = bool(result.strip())
+            enabled = await enabled_services(project_id, [service_domain_name])
+            is_enabled = service_domain_name in enabled
             self.finish({"success": True, "is_enabled": is_enabled})
         except Exception as e:
             self.log.error(f"Error checking if service {service_domain_name} is enabled: {e}")
             self.finish({"success": False, "is_enabled": False, "error": str(e)})
+
+
+class CheckApisController(APIHandler):
+    @tornado.web.authenticated
+    async def post(self):
+        """
+        Check which of several GCP API services are enabled for the current project.
+
+        Service names are passed as a comma-separated `service_names` argument
+        and resolved with a single gcloud call.
+        """
+        service_names = [
+            name.strip()
+            for name in self.get_argument("service_names").split(",")
+            if name.strip()
+        ]
+        domain_names = await asyncio.gather(
+            *[_service_domain_name(name) for name in service_names]
+        )
+        project_id = (await credentials.get_cached())["project_id"]
+
+        try:
+            enabled = await enabled_services(
+                project_id, [domain for domain in domain_names if domain]
+            )
+            services = {
+                name: bool(domain) and domain in enabled
+                for name, domain in zip(service_names, domain_names)
+            }
+            self.finish(json.dumps({"success": True, "services": services}))
+        except Exception as e:
+            self.log.error(f"Error checking if services {service_names} are enabled: {e}")
+            self.finish({"success": False, "services": {}, "error": str(e)})
@@ -0,0 +1,203 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+
+import tornado
+from jupyter_server.base.handlers import APIHandler
+
+from dataproc_jupyter_plugin import credentials
+from dataproc_jupyter_plugin.commons import http_session
+from dataproc_jupyter_plugin.commons.constants import (
+    DATAPROC_BATCH_STORE_MAX,
+    DATAPROC_LIST_PAGE_SIZE,
+    DATAPROC_WATCH_KEEPALIVE,
+)
+from dataproc_jupyter_plugin.services import dataproc
+
+
+class WatchController(APIHandler):
+    subscription = None
+
+    def on_connection_close(self):
+        # Stops the loop in get() without waiting for its next write to fail.
+        if self.subscription is not None:
+            self.subscription.close()
+
+    @tornado.web.authenticated
+    async def get(self):
+        """Streams Dataproc resource changes as server-sent events.
+
+        Clusters, batches, sessions and jobs are polled once per project and
+        region on the server, however many clients are watching. Each event's
+        data is a JSON object described in `services.dataproc.ResourceWatch`.
+        """
+        cached = await credentials.get_cached()
+        project_id = self.get_argument("project_id", default=cached["project_id"])
+        region_id = self.get_argument("region_id", default=cached["region_id"])
+        if not project_id or not region_id:
+            self.set_status(400)
+            self.finish({"error": "Project and region must be configured"})
+            return
+
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        subscription = self.subscription = dataproc.watcher.subscribe(
+            project_id, region_id
+        )
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(), DATAPROC_WATCH_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    self.write(": keepalive\n\n")
+                else:
+                    if event is None:
+                        break
+                    self.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n")
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            self.log.debug("Dataproc watch client disconnected")
+        finally:
+            dataproc.watcher.unsubscribe(subscription)
+
+    @tornado.web.authenticated
+    async def post(self):
+        """Polls watched resources now, e.g. after the user created or stopped one.
+
+        `kind` may be repeated to refresh only some resource kinds.
+        """
+        cached = await credentials.get_cached()
+        project_id = self.get_argument("project_id", default=cached["project_id"])
+        region_id = self.get_argument("region_id", default=cached["region_id"])
+        kinds = self.get_arguments("kind")
+        unknown = [kind for kind in kinds if kind not in dataproc.RESOURCE_KINDS]
+        if unknown:
+            self.set_status(400)
+            self.finish({"error": f"Unknown resource kinds: {', '.join(unknown)}"})
+            return
+        dataproc.watcher.refresh(project_id, region_id, kinds)
+        self.set_status(204)
+        self.finish()
+
+
+class WatchStatsController(APIHandler):
+    @tornado.web.authenticated
+    async def get(self):
+        self.finish(
+            json.dumps({**dataproc.watcher.stats(), "batches": dataproc.batch_stores.stats()})
+        )
+
+
+class InventoryController(APIHandler):
+    @tornado.web.authenticated
+    async def get(self):
+        """Returns the Dataproc resources of a project and region in one response.
+
+        The body is a `snapshot` event (see `services.dataproc.ResourceWatch`).
+        After a server restart it comes from the inventory persisted on disk,
+        marked `stale`, while the server refreshes it in the background.
+        """
+        try:
+            cached = await credentials.get_cached()
+            project_id = self.get_argument("project_id", default=cached["project_id"])
+            region_id = self.get_argument("region_id", default=cached["region_id"])
+            if not project_id or not region_id:
+                self.set_status(400)
+                self.finish({"error": "Project and region must be configured"})
+                return
+            self.finish(json.dumps(await dataproc.watcher.snapshot(project_id, region_id)))
+        except Exception as e:
+            self.log.exception("Error fetching Dataproc inventory")
+            self.finish({"error": str(e)})
+
+
+class JobListController(APIHandler):
+    @tornado.web.authenticated
+    async def get(self):
+        """Lists the jobs of every cluster in a region (see `services.dataproc.index_jobs`).
+
+        `clusterName` may be repeated to list only some clusters. The body is
+        serialized with sorted keys, so an unchanged listing has the same
+        ETag and Tornado answers a matching `If-None-Match` with an empty 304.
+        """
+        try:
+            cached = await credentials.get_cached()
+            project_id = self.get_argument("project_id", default=cached["project_id"])
+            region_id = self.get_argument("region_id", default=cached["region_id"])
+            if not project_id or not region_id:
+                self.set_status(400)
+                self.finish({"error": "Project and region must be configured"})
+                return
+            client = dataproc.Client(cached, self.log, http_session.manager.get())
+            cluster_names = self.get_arguments("clusterName")
+            if not cluster_names:
+                clusters = await client.list_resources("clusters", project_id, region_id)
+                cluster_names = [cluster["clusterName"] for cluster in clusters]
+            results = await client.list_cluster_jobs(project_id, region_id, cluster_names)
+            self.finish(json.dumps(dataproc.index_jobs(results), sort_keys=True))
+        except Exception as e:
+            self.log.exception("Error listing jobs")
+            self.set_status(500)
+            self.finish({"error": str(e)})
+
+
+class BatchListController(APIHandler):
+    @tornado.web.authenticated
+    async def get(self):
+        """Serves a page of batches from the server's incrementally synced store.
+
+        Query arguments: `pageSize`, `pageToken`, `state` (repeatable),
+        `search` (a substring of the batch ID), `orderBy` (`create_time desc`,
+        the default, or `create_time asc`) and `refresh=true` to sync even if
+        the store was synced moments ago.
+        """
+        try:
+            cached = await credentials.get_cached()
+            project_id = self.get_argument("project_id", default=cached["project_id"])
+            region_id = self.get_argument("region_id", default=cached["region_id"])
+            page_size = int(
+                self.get_argument("pageSize", default=str(DATAPROC_LIST_PAGE_SIZE))
+            )
+            order_by = self.get_argument("orderBy", default="create_time desc")
+            if not 0 < page_size <= DATAPROC_BATCH_STORE_MAX or order_by not in (
+                "create_time",
+                "create_time asc",
+                "create_time desc",
+            ):
+                self.set_status(400)
+                self.finish({"error": "Unsupported pageSize or orderBy"})
+                return
+            store = dataproc.batch_stores.get(project_id, region_id)
+            client = dataproc.Client(cached, self.log, http_session.manager.get())
+            await store.sync(client, force=self.get_argument("refresh", default="") == "true")
+            try:
+                page = store.page(
+                    page_size,
+                    page_token=self.get_argument("pageToken", default=None),
+                    states=self.get_arguments("state"),
+                    search=self.get_argument("search", default=None),
+                    ascending=order_by != "create_time desc",
+                )
+            except ValueError as e:
+                self.set_status(400)
+                self.finish({"error": str(e)})
+                return
+            self.finish(json.dumps(page))
+        except Exception as e:
+            self.log.exception("Error listing batches")
+            self.finish({"error": str(e)})
@@ -14,11 +14,11 @@
 
 import json
 
-import aiohttp
 import tornado
 from jupyter_server.base.handlers import APIHandler
 
 from dataproc_jupyter_plugin import credentials
+from dataproc_jupyter_plugin.commons import http_session
 from dataproc_jupyter_plugin.services import version
 
 
@@ -27,12 +27,10 @@ class LatestVersionController(APIHandler):
     async def get(self):
         try:
             package_name = self.get_argument("packageName")
-            async with aiohttp.ClientSession() as client_session:
-                client = version.Client(
-                    await credentials.get_cached(), self.log, client_session
-                )
-                version_id = await client.get_latest_version(package_name)
-            
+            client = version.Client(
+                await credentials.get_cached(), self.log, http_session.manager.get()
+            )
+            version_id = await client.get_latest_version(package_name)
             self.finish(json.dumps(version_id))
         except Exception as e:
             self.log.exception("Error fetching version")
@@ -40,18 +38,35 @@ class LatestVersionController(APIHandler):
 
 
 class UpdatePackage(APIHandler):
+    @tornado.web.authenticated
+    async def get(self):
+        try:
+            job_id = self.get_argument("jobId")
+            offset = int(self.get_argument("offset", default="0"))
+            job = version.get_upgrade_job(job_id)
+            if job is None:
+                self.set_status(404)
+                self.finish({"error": f"Unknown upgrade job: {job_id}"})
+                return
+            self.finish(json.dumps(job.to_dict(offset)))
+        except Exception as e:
+            self.log.exception("Error fetching upgrade status")
+            self.finish({"error": str(e)})
+
     @tornado.web.authenticated
     async def post(self):
         try:
             package_name = self.get_argument("packageName")
-            async with aiohttp.ClientSession() as client_session:
-                client = version.Client(
-                    await credentials.get_cached(), self.log, client_session
-                )
+            wait = self.get_argument("wait", default="true").lower() != "false"
+            client = version.Client(
+                await credentials.get_cached(), self.log, http_session.manager.get()
+            )
+            if wait:
                 is_updated = await client.updatePlugin(package_name)
-            
+            else:
+                is_updated = client.start_upgrade(package_name).to_dict()
+
             self.finish(json.dumps(is_updated))
         except Exception as e:
             self.log.exception("Error updating package")
             self.finish({"error": str(e)})
-
@@ -12,11 +12,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+
+import asyncio
+import datetime
+import functools
 import logging
+import subprocess
+import sys
+import time
 
 from google.cloud.jupyter_config.config import (
     async_get_gcloud_config,
     async_run_gcloud_subcommand,
+    clear_gcloud_cache,
+)
+
+from dataproc_jupyter_plugin.commons.constants import (
+    CREDENTIALS_EXPIRY_MARGIN,
+    CREDENTIALS_MAX_TTL,
+    CREDENTIALS_REFRESH_MARGIN,
+    LOGIN_TIMEOUT,
 )
 
 
@@ -25,6 +40,11 @@ async def _gcp_credentials():
     return await async_get_gcloud_config("credential.access_token")
 
 
+async def _gcp_token_expiry():
+    """Helper method to get the access token expiry reported by gcloud"""
+    return await async_get_gcloud_config("credential.token_expiry")
+
+
 async def _gcp_project():
     """Helper method to get the project configured through gcloud"""
     return await async_get_gcloud_config("configuration.properties.core.project")
@@ -40,16 +60,27 @@ async def _gcp_region():
     return region
 
 
-async def get_cached():
-    """Retrieves and caches GCP credentials and configuration.
-    
+def _seconds_until(token_expiry):
+    """Returns the seconds remaining until a gcloud `token_expiry` timestamp,
+    or None if the timestamp is missing or cannot be parsed."""
+    if not token_expiry or not isinstance(token_expiry, str):
+        return None
+    try:
+        expiry = datetime.datetime.fromisoformat(token_expiry.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return (expiry - now).total_seconds()
+
+
+async def _fetch_credentials():
+    """Reads credentials from gcloud.
+
     Returns:
-        A dictionary containing:
-        - project_id: The GCP project ID
-        - region_id: The default region
-        - access_token: The access token for authentication
-        - config_error: 1 if project or region are not configured, else 0
-        - login_error: 1 if not logged in or missing access token, else 0
+        A tuple of the credentials dictionary (see `get_cached`) and the
+        number of seconds until the access token expires, or None if unknown.
     """
     credentials = {
         "project_id": "",
@@ -58,16 +89,236 @@ async def get_cached():
         "config_error": 0,
         "login_error": 0,
     }
+    expires_in = None
     try:
         credentials["project_id"] = await _gcp_project()
         credentials["region_id"] = await _gcp_region()
         credentials["access_token"] = await _gcp_credentials()
+        expires_in = _seconds_until(await _gcp_token_expiry())
     except Exception as ex:
         logging.error(f"Error getting gcloud config: {ex}")
-    
+
     if not credentials["access_token"]:
         credentials["login_error"] = 1
     elif not credentials["project_id"] or not credentials["region_id"]:
         credentials["config_error"] = 1
 
-    return credentials
+    return credentials, expires_in
+
+
+class CredentialsProvider:
+    """Caches the credentials read from gcloud.
+
+    Cached credentials are served until shortly before the access token
+    expires (bounded by `CREDENTIALS_MAX_TTL`). Within
+    `CREDENTIALS_REFRESH_MARGIN` of that point they are still served, but a
+    refresh is started in the background. Concurrent callers that miss the
+    cache all wait on the same in-flight refresh, so gcloud is invoked at
+    most once at a time.
+
+    Results with a login or config error are never cached, so that fixing
+    the gcloud setup takes effect on the next request.
+    """
+
+    def __init__(self):
+        self._credentials = None
+        self._expires_at = 0
+        self._refresh_at = 0
+        self._refresh_task = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    async def get(self):
+        now = time.monotonic()
+        if self._credentials is not None and now < self._expires_at:
+            self.hits += 1
+            if now >= self._refresh_at:
+                self._start_refresh()
+            return dict(self._credentials)
+
+        self.misses += 1
+        credentials = await asyncio.shield(self._start_refresh())
+        return dict(credentials)
+
+    def invalidate(self):
+        """Drops the cached credentials so the next `get` reads from gcloud."""
+        self._credentials = None
+        self._expires_at = 0
+        self._refresh_at = 0
+        self._refresh_task = None
+        self._generation += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+        }
+
+    def _start_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh())
+        return self._refresh_task
+
+    async def _refresh(self):
+        self.refreshes += 1
+        generation = self._generation
+        credentials, expires_in = await _fetch_credentials()
+        if generation != self._generation:
+            # Invalidated while the refresh was in flight.
+            return credentials
+        if credentials["login_error"] or credentials["config_error"]:
+            self._credentials = None
+            self._expires_at = 0
+            return credentials
+
+        ttl = CREDENTIALS_MAX_TTL
+        if expires_in is not None:
+            ttl = min(ttl, expires_in - CREDENTIALS_EXPIRY_MARGIN)
+        now = time.monotonic()
+        self._credentials = credentials
+        self._expires_at = now + ttl
+        self._refresh_at = now + ttl - CREDENTIALS_REFRESH_MARGIN
+        return credentials
+
+
+provider = CredentialsProvider()
+
+
+async def get_cached():
+    """Retrieves and caches GCP credentials and configuration.
+
+    Returns:
+        A dictionary containing:
+        - project_id: The GCP project ID
+        - region_id: The default region
+        - access_token: The access token for authentication
+        - config_error: 1 if project or region are not configured, else 0
+        - login_error: 1 if not logged in or missing access token, else 0
+    """
+    return await provider.get()
+
+
+def invalidate_cached():
+    """Drops the cached credentials, e.g. after the gcloud config changes."""
+    provider.invalidate()
+
+
+_login_callbacks = []
+
+
+def on_login(callback):
+    """Registers `callback()` to run after every successful `gcloud auth login`."""
+    _login_callbacks.append(callback)
+
+
+class GcloudLogin:
+    """Runs `gcloud auth login` in the background.
+
+    The login waits on the user completing the flow in their browser, so it
+    runs as an asyncio subprocess, killed after `LOGIN_TIMEOUT` seconds or
+    when the login is closed. Only one login runs at a time; the cached
+    credentials are dropped once it succeeds.
+    """
+
+    COMMAND = "gcloud auth login"
+
+    NOT_STARTED = "NOT_STARTED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+    def __init__(self):
+        self.status = self.NOT_STARTED
+        self.error = ""
+        self._task = None
+
+    def start(self):
+        if self.status != self.RUNNING:
+            self.status = self.RUNNING
+            self.error = ""
+            self._task = asyncio.ensure_future(self._login())
+        return self
+
+    async def wait(self):
+        await asyncio.shield(self._task)
+
+    def to_dict(self):
+        result = {"login": self.status}
+        if self.error:
+            result["error"] = self.error
+        return result
+
+    async def close(self):
+        """Stops a running login, killing gcloud."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        if sys.platform.startswith("win"):
+            # Jupyter's SelectorEventLoop on Windows does not support
+            # subprocesses (jupyter_server#1587), so there gcloud runs in a
+            # worker thread; `subprocess.run` kills it on timeout.
+            run_login = functools.partial(
+                subprocess.run,
+                self.COMMAND,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                shell=True,
+                timeout=LOGIN_TIMEOUT,
+                check=True,
+            )
+            await asyncio.get_running_loop().run_in_executor(None, run_login)
+            return
+        process = await asyncio.create_subprocess_shell(
+            self.COMMAND,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), LOGIN_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode, self.COMMAND, stdout, stderr
+            )
+
+    async def _login(self):
+        try:
+            await self._run()
+        except asyncio.CancelledError:
+            self.error = "Login cancelled"
+            self.status = self.FAILED
+            raise
+        except (asyncio.TimeoutError, subprocess.TimeoutExpired):
+            logging.error("gcloud auth login timed out")
+            self.error = f"Login timed out after {LOGIN_TIMEOUT} seconds"
+            self.status = self.FAILED
+            return
+        except (subprocess.CalledProcessError, OSError) as ex:
+            logging.error(f"gcloud auth login failed: {ex}")
+            self.error = str(ex)
+            self.status = self.FAILED
+            return
+        clear_gcloud_cache()
+        invalidate_cached()
+        for callback in _login_callbacks:
+            try:
+                callback()
+            except Exception as ex:
+                logging.error(f"Error after gcloud auth login: {ex}")
+        self.status = self.SUCCEEDED
+
+
+login = GcloudLogin()
@@ -26,20 +26,25 @@ from google.cloud.jupyter_config.config import (
 from jupyter_server.base.handlers import APIHandler
 from jupyter_server.serverapp import ServerApp
 from jupyter_server.utils import url_path_join
-from traitlets import Bool, Undefined, Unicode
+from traitlets import Bool, Float, Int, Undefined, Unicode
 from traitlets.config import SingletonConfigurable
 
 from dataproc_jupyter_plugin import credentials, urls
 from dataproc_jupyter_plugin.commons import constants
 from dataproc_jupyter_plugin.controllers import (
     bigquery,
-    checkApiEnabled
+    checkApiEnabled,
+    dataproc,
 )
 from dataproc_jupyter_plugin.controllers.version import (
     LatestVersionController,
     UpdatePackage,
     tornado
 )
+from dataproc_jupyter_plugin.services.bigquery import metadata_cache, preview_cache
+from dataproc_jupyter_plugin.services.dataproc import batch_stores
+from dataproc_jupyter_plugin.services.inventory import inventory
+from dataproc_jupyter_plugin.services.search_index import search_index
 
 from importlib.metadata import version, PackageNotFoundError
 
@@ -97,6 +102,30 @@ class DataprocPluginConfig(SingletonConfigurable):
         help="Enable integration with BigQuery in JupyterLab",
     )
 
+    enable_bigquery_search_index = Bool(
+        False,
+        config=True,
+        help="Answer BigQuery searches from a local index of the datasets and tables already browsed, falling back to Dataplex",
+    )
+
+    bigquery_prefetch_depth = Int(
+        constants.PREFETCH_DEPTH,
+        config=True,
+        help="Number of dataset explorer pages to prefetch ahead of the page being viewed. 0 disables prefetching.",
+    )
+
+    bigquery_prefetch_memory_budget = Int(
+        constants.PREFETCH_MEMORY_BUDGET,
+        config=True,
+        help="Maximum size in bytes of prefetched dataset explorer pages that have not been viewed yet.",
+    )
+
+    persist_dataproc_inventory = Bool(
+        True,
+        config=True,
+        help="Save the last known Dataproc clusters, session templates, batches and sessions to the Jupyter data directory, to show them immediately after a server restart",
+    )
+
     enable_metastore_integration = Bool(
         False,
         config=True,
@@ -117,6 +146,30 @@ class DataprocPluginConfig(SingletonConfigurable):
         help="Custom User-Agent header value for outbound requests to the kernels mixer.",
     )
 
+    http_pool_size = Int(
+        constants.HTTP_CONNECTION_LIMIT,
+        config=True,
+        help="Maximum number of pooled connections for outbound HTTP requests.",
+    )
+
+    http_pool_size_per_host = Int(
+        constants.HTTP_CONNECTION_LIMIT_PER_HOST,
+        config=True,
+        help="Maximum number of pooled connections per host for outbound HTTP requests.",
+    )
+
+    http_connect_timeout = Float(
+        constants.HTTP_CONNECT_TIMEOUT,
+        config=True,
+        help="Timeout in seconds for establishing outbound HTTP connections.",
+    )
+
+    http_request_timeout = Float(
+        constants.HTTP_REQUEST_TIMEOUT,
+        config=True,
+        help="Total timeout in seconds for outbound HTTP requests.",
+    )
+
 
 class SettingsHandler(APIHandler):
     @tornado.web.authenticated
@@ -152,19 +205,31 @@ class CredentialsHandler(APIHandler):
         self.finish(json.dumps(cached))
 
 
+def _clear_account_data():
+    # Listings fetched as the previous account must not be served to the new one.
+    metadata_cache.invalidate()
+    preview_cache.invalidate()
+    search_index.clear()
+    batch_stores.invalidate()
+    inventory.clear()
+
+
+credentials.on_login(_clear_account_data)
+
+
 class LoginHandler(APIHandler):
+    @tornado.web.authenticated
+    def get(self):
+        self.finish(credentials.login.to_dict())
+
     @tornado.web.authenticated
     async def post(self):
-        cmd = "gcloud auth login"
-        process = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True
-        )
-        output, _ = process.communicate()
-        # Check if the authentication was successful
-        if process.returncode == 0:
-            self.finish({"login": "SUCCEEDED"})
-        else:
-            self.finish({"login": "FAILED"})
+        login = credentials.login.start()
+        # By default wait for the login to complete; pass `wait=false` to
+        # return immediately and poll its status with GET instead.
+        if self.get_argument("wait", default="true").lower() != "false":
+            await login.wait()
+        self.finish(login.to_dict())
 
 
 class ConfigHandler(APIHandler):
@@ -191,6 +256,13 @@ class ConfigHandler(APIHandler):
                 await async_run_gcloud_subcommand(f"config set project {project_id}")
             await async_run_gcloud_subcommand(f"config set dataproc/region {region}")
             clear_gcloud_cache()
+            credentials.invalidate_cached()
+            urls.clear_cache()
+            checkApiEnabled.clear_cache()
+            metadata_cache.invalidate()
+            preview_cache.invalidate()
+            search_index.clear()
+            batch_stores.invalidate()
             configure_gateway_client_url(self.config, self.log, config_project_number)
             self.finish({"config": ERROR_MESSAGE + "successful"})
         except subprocess.CalledProcessError as er:
@@ -247,16 +319,25 @@ def setup_handlers(web_app):
         "getGcpServiceUrls": UrlHandler,
         "log": LogHandler,
         "bigQueryDataset": bigquery.DatasetController,
+        "bigQueryAllDatasets": bigquery.AllDatasetsController,
         "bigQueryTable": bigquery.TableController,
         "bigQueryDatasetInfo": bigquery.DatasetInfoController,
         "bigQueryTableInfo": bigquery.TableInfoController,
+        "bigQueryTableInfoBulk": bigquery.BulkTableInfoController,
         "bigQueryPreview": bigquery.PreviewController,
         "bigQueryProjectsList": bigquery.ProjectsController,
         "bigQuerySearch": bigquery.SearchController,
+        "bigQueryCache": bigquery.CacheController,
         "checkResourceManager": ResourceManagerHandler,
         "jupyterlabVersion": LatestVersionController,
         "updatePlugin": UpdatePackage,
         "checkApiEnabled": checkApiEnabled.CheckApiController,
+        "checkApisEnabled": checkApiEnabled.CheckApisController,
+        "dataprocWatch": dataproc.WatchController,
+        "dataprocWatchStats": dataproc.WatchStatsController,
+        "dataprocBatches": dataproc.BatchListController,
+        "dataprocInventory": dataproc.InventoryController,
+        "dataprocJobs": dataproc.JobListController,
     }
     handlers = [(full_path(name), handler) for name, handler in handlersMap.items()]
     web_app.add_handlers(host_pattern, handlers)
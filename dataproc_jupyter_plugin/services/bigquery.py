@@ -13,9 +13,15 @@
 # limitations under the License.
 
 
+import asyncio
+import json
+import time
+
 import aiohttp
+import cachetools
 
 from dataproc_jupyter_plugin import urls
+from dataproc_jupyter_plugin.commons import retry
 from dataproc_jupyter_plugin.commons.constants import (
     BIGQUERY_SERVICE_NAME,
     CLOUDRESOURCEMANAGER_SERVICE_NAME,
@@ -24,9 +30,347 @@ from dataproc_jupyter_plugin.commons.constants import (
 )
 
 from dataproc_jupyter_plugin.commons.constants import (
-    BQ_PUBLIC_DATASET_PROJECT_ID,BASE_PROJECT_ID,PAGE_SIZE_LIMIT
+    BQ_PUBLIC_DATASET_PROJECT_ID,BASE_PROJECT_ID,PAGE_SIZE_LIMIT,SEARCH_PAGE_SIZE,
+    METADATA_CACHE_MAX_ENTRIES,METADATA_CACHE_TTL,PREFETCH_DEPTH,PREFETCH_MEMORY_BUDGET,
+    PREVIEW_CACHE_MAX_TABLES,PREVIEW_CACHE_MAX_ROWS_PER_TABLE,STREAM_CHUNK_SIZE
 )
 
+
+class MetadataCache:
+    """LRU cache with TTL for dataset explorer listings and metadata.
+
+    Keys are `(kind, project_id, location, dataset_id, table_id, page_token)`
+    tuples, so entries can be invalidated per project or per dataset.
+    Error responses are never cached.
+
+    Listings can also be prefetched: after a page is served, the following
+    `prefetch_depth` pages are fetched in the background while the prefetched
+    but not yet requested pages fit in `prefetch_memory_budget` bytes. A
+    request for a page that is still being prefetched waits for it.
+    """
+
+    def __init__(
+        self,
+        maxsize=METADATA_CACHE_MAX_ENTRIES,
+        ttl=METADATA_CACHE_TTL,
+        prefetch_depth=PREFETCH_DEPTH,
+        prefetch_memory_budget=PREFETCH_MEMORY_BUDGET,
+    ):
+        self._cache = cachetools.TTLCache(maxsize=maxsize, ttl=ttl)
+        self._pending = {}
+        # Sizes of pages that were prefetched but have not been served yet.
+        self._prefetched = {}
+        self.configure_prefetch(prefetch_depth, prefetch_memory_budget)
+        self.hits = 0
+        self.misses = 0
+        self.prefetches = 0
+        self.prefetch_hits = 0
+        self.prefetch_wasted = 0
+
+    def configure_prefetch(self, depth, memory_budget):
+        self.prefetch_depth = depth
+        self.prefetch_memory_budget = memory_budget
+
+    @staticmethod
+    def key(kind, project_id, location=None, dataset_id=None, table_id=None, page_token=None):
+        return (kind, project_id, location, dataset_id, table_id, page_token or "")
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def put(self, key, value):
+        if isinstance(value, dict) and "error" not in value:
+            self._cache[key] = value
+
+    async def get_or_fetch(self, key, fetch, refresh=False):
+        """Returns `(value, hit)`, calling `fetch()` on a miss or when refreshing."""
+        if not refresh:
+            pending = self._pending.get(key)
+            if pending is not None:
+                value = await self._await_prefetch(pending)
+                if value is not None:
+                    self._served(key)
+                    return value, True
+            value = self.get(key)
+            if value is not None:
+                self._served(key)
+                return value, True
+        self.misses += 1
+        value = await fetch()
+        self.put(key, value)
+        return value, False
+
+    @staticmethod
+    async def _await_prefetch(pending):
+        """Waits for a prefetch, returning None if it was cancelled or failed."""
+        try:
+            value = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            return None
+        except Exception:
+            return None
+        if not isinstance(value, dict) or "error" in value:
+            return None
+        return value
+
+    def _served(self, key):
+        self.hits += 1
+        if self._prefetched.pop(key, None) is not None:
+            self.prefetch_hits += 1
+
+    def prefetch_pages(self, response, page):
+        """Starts prefetching the pages that follow `response`.
+
+        `page(page_token)` returns the `(key, fetch)` pair for a page.
+        """
+        self._prefetch_next(response, page, self.prefetch_depth)
+
+    def _prefetch_next(self, response, page, depth):
+        page_token = isinstance(response, dict) and response.get("nextPageToken")
+        if depth <= 0 or not page_token:
+            return
+        key, fetch = page(page_token)
+        if key in self._pending or key in self._cache:
+            return
+        if self._prefetched_bytes() >= self.prefetch_memory_budget:
+            return
+        self._pending[key] = asyncio.ensure_future(
+            self._prefetch(key, fetch, page, depth)
+        )
+
+    async def _prefetch(self, key, fetch, page, depth):
+        self.prefetches += 1
+        try:
+            value = await fetch()
+        finally:
+            if self._pending.get(key) is asyncio.current_task():
+                del self._pending[key]
+        self.put(key, value)
+        if key in self._cache:
+            self._prefetched[key] = len(json.dumps(value))
+            self._prefetch_next(value, page, depth - 1)
+        return value
+
+    def _prefetched_bytes(self):
+        for key in list(self._prefetched):
+            if key not in self._cache:
+                # Expired or evicted before anyone asked for it.
+                del self._prefetched[key]
+                self.prefetch_wasted += 1
+        return sum(self._prefetched.values())
+
+    def stats(self):
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "prefetches": self.prefetches,
+            "prefetch_hits": self.prefetch_hits,
+            "prefetch_wasted": self.prefetch_wasted,
+            "prefetch_hit_rate": (
+                self.prefetch_hits / self.prefetches if self.prefetches else 0.0
+            ),
+            "prefetched_bytes": self._prefetched_bytes(),
+        }
+
+    def invalidate(self, project_id=None, dataset_id=None):
+        """Drops cached entries, optionally only those of a project or dataset."""
+        def matches(key):
+            return (project_id is None or key[1] == project_id) and (
+                dataset_id is None or key[3] == dataset_id
+            )
+
+        for key in [key for key in self._pending if matches(key)]:
+            self._pending.pop(key).cancel()
+        for key in [key for key in self._prefetched if matches(key)]:
+            del self._prefetched[key]
+        if project_id is None and dataset_id is None:
+            self._cache.clear()
+            return
+        for key in list(self._cache.keys()):
+            if matches(key):
+                self._cache.pop(key, None)
+
+
+metadata_cache = MetadataCache()
+
+
+class RowWindowCache:
+    """Per-table cache of the row ranges fetched for table previews.
+
+    Each table (and column projection) keeps a sorted list of disjoint
+    `[start, rows]` windows; a new range that overlaps or touches existing
+    windows is merged with them, so any sub-range of what has been fetched
+    is served locally. Entries are tagged with the table's `lastModifiedTime`
+    and dropped as soon as a different one is seen. At most `max_tables`
+    tables and `max_rows_per_table` rows per table are kept; when a table
+    goes over, the windows furthest from the latest one are dropped first.
+    """
+
+    def __init__(
+        self,
+        max_tables=PREVIEW_CACHE_MAX_TABLES,
+        max_rows_per_table=PREVIEW_CACHE_MAX_ROWS_PER_TABLE,
+    ):
+        self._tables = cachetools.LRUCache(maxsize=max_tables)
+        self.max_rows_per_table = max_rows_per_table
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(project_id, dataset_id, table_id, selected_fields=None):
+        return (project_id, dataset_id, table_id, selected_fields or "")
+
+    def get(self, key, last_modified, start_index, max_results):
+        """Returns a `tabledata.list`-shaped response, or None on a miss."""
+        entry = self._tables.get(key)
+        if entry is None or entry["last_modified"] != last_modified:
+            self.misses += 1
+            return None
+        end = min(start_index + max_results, entry["total_rows"])
+        for start, rows in entry["windows"]:
+            if start <= start_index and end <= start + len(rows):
+                self.hits += 1
+                return {
+                    "kind": "bigquery#tableDataList",
+                    "totalRows": str(entry["total_rows"]),
+                    "rows": rows[start_index - start:end - start],
+                }
+        self.misses += 1
+        return None
+
+    def put(self, key, last_modified, start_index, response):
+        if "error" in response:
+            return
+        entry = self._tables.get(key)
+        if entry is None or entry["last_modified"] != last_modified:
+            entry = {"last_modified": last_modified, "windows": []}
+            self._tables[key] = entry
+        entry["total_rows"] = int(response.get("totalRows", 0))
+        new_start, new_rows = start_index, response.get("rows", [])
+        if not new_rows:
+            return
+        windows = []
+        for start, rows in entry["windows"]:
+            if start + len(rows) < new_start or new_start + len(new_rows) < start:
+                windows.append([start, rows])
+                continue
+            # Overlapping or adjacent: merge, preferring the newly fetched rows.
+            merged_start = min(start, new_start)
+            merged = rows[:max(new_start - start, 0)] + new_rows
+            merged += rows[new_start + len(new_rows) - start:]
+            new_start, new_rows = merged_start, merged
+        windows.append([new_start, new_rows])
+        windows.sort(key=lambda window: window[0])
+        entry["windows"] = self._trim(windows, new_start)
+
+    def _trim(self, windows, latest_start):
+        def distance(window):
+            return abs(window[0] - latest_start)
+
+        kept, total = [], 0
+        for window in sorted(windows, key=distance):
+            if total + len(window[1]) > self.max_rows_per_table and kept:
+                continue
+            kept.append(window)
+            total += len(window[1])
+        return sorted(kept, key=lambda window: window[0])
+
+    def stats(self):
+        return {
+            "tables": len(self._tables),
+            "rows": sum(
+                len(rows)
+                for entry in self._tables.values()
+                for _, rows in entry["windows"]
+            ),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def invalidate(self, project_id=None, dataset_id=None):
+        """Drops cached rows, optionally only those of a project or dataset."""
+        for key in list(self._tables.keys()):
+            if (project_id is None or key[0] == project_id) and (
+                dataset_id is None or key[1] == dataset_id
+            ):
+                self._tables.pop(key, None)
+
+
+preview_cache = RowWindowCache()
+
+
+def _convert_value(value, field):
+    if field.get("mode") == "REPEATED":
+        return [_convert_scalar(item["v"], field) for item in value or []]
+    return _convert_scalar(value, field)
+
+
+def _convert_scalar(value, field):
+    if field.get("type") in ("RECORD", "STRUCT") and value is not None:
+        return {
+            subfield["name"]: _convert_value(cell["v"], subfield)
+            for subfield, cell in zip(field.get("fields", []), value["f"])
+        }
+    return value
+
+
+def _schema_header(field):
+    header = {k: field[k] for k in ("name", "type", "mode") if k in field}
+    if "fields" in field:
+        header["fields"] = [_schema_header(subfield) for subfield in field["fields"]]
+    return header
+
+
+def _project_schema(schema_fields, paths):
+    """Keeps the fields named by `paths`, descending into records for dotted paths."""
+    selected = {}
+    for path in paths:
+        name, _, rest = path.partition(".")
+        children = selected.setdefault(name, [])
+        if children is not None:
+            if rest:
+                children.append(rest)
+            else:
+                selected[name] = None
+    projected = []
+    for field in schema_fields:
+        if field["name"] not in selected:
+            continue
+        children = selected[field["name"]]
+        if children:
+            field = dict(field, fields=_project_schema(field.get("fields", []), children))
+        projected.append(field)
+    return projected
+
+
+def to_columnar(preview, schema_fields, selected_fields=None):
+    """Converts a `tabledata.list` response into one array of values per column.
+
+    Nested `f`/`v` cells are unwrapped: records become objects keyed by
+    subfield name and repeated fields become arrays. `selected_fields` is the
+    `selectedFields` list the rows were projected to; dotted paths select
+    subfields of records, as they do in BigQuery.
+    """
+    if selected_fields:
+        paths = [path.strip() for path in selected_fields.split(",") if path.strip()]
+        schema_fields = _project_schema(schema_fields, paths)
+    columns = [[] for _ in schema_fields]
+    for row in preview.get("rows", []):
+        for column, field, cell in zip(columns, schema_fields, row["f"]):
+            column.append(_convert_value(cell["v"], field))
+    columnar = {
+        "schema": [_schema_header(field) for field in schema_fields],
+        "columns": columns,
+        "totalRows": preview.get("totalRows"),
+    }
+    if "pageToken" in preview:
+        columnar["pageToken"] = preview["pageToken"]
+    return columnar
+
+
 class Client:
     def __init__(self, credentials, log, client_session):
         self.log = log
@@ -37,10 +381,44 @@ class Client:
         ):
             self.log.exception("Missing required credentials")
             raise ValueError("Missing required credentials")
+        self.update_credentials(credentials)
+        self.client_session = client_session
+        self._service_urls = {}
+        self._service_urls_generation = urls.cache_generation()
+        self._in_flight = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+
+    def update_credentials(self, credentials):
+        """Swaps in refreshed credentials while keeping the client session."""
         self._access_token = credentials["access_token"]
         self.project_id = credentials["project_id"]
         self.region_id = credentials["region_id"]
-        self.client_session = client_session
+
+    async def resolve_service_urls(self, refresh=False):
+        """Resolves the endpoints of every service this client calls.
+
+        Endpoints are memoized for the lifetime of the client; pass
+        `refresh=True` to re-read them, e.g. after endpoint overrides change.
+        """
+        if refresh:
+            self._service_urls = {}
+        service_names = [
+            BIGQUERY_SERVICE_NAME,
+            CLOUDRESOURCEMANAGER_SERVICE_NAME,
+            DATAPLEX_SERVICE_NAME,
+        ]
+        await asyncio.gather(*[self.service_url(name) for name in service_names])
+
+    async def service_url(self, service_name):
+        if self._service_urls_generation != urls.cache_generation():
+            self._service_urls = {}
+            self._service_urls_generation = urls.cache_generation()
+        if service_name not in self._service_urls:
+            self._service_urls[service_name] = await urls.gcp_service_url(
+                service_name
+            )
+        return self._service_urls[service_name]
 
     def create_headers(self):
         return {
@@ -48,174 +426,270 @@ class Client:
             "Authorization": f"Bearer {self._access_token}",
         }
 
-    async def list_datasets(self, page_token, project_id, location):
-        try:
-            if project_id == BQ_PUBLIC_DATASET_PROJECT_ID:
-                # Use BigQuery API for public datasets
-                bigquery_url = await urls.gcp_service_url(BIGQUERY_SERVICE_NAME)
-                api_endpoint = f"{bigquery_url}bigquery/v2/projects/{BQ_PUBLIC_DATASET_PROJECT_ID}/datasets?maxResults={PAGE_SIZE_LIMIT}"
-                if page_token:
-                    api_endpoint += f"&pageToken={page_token}"
-            else:
-                # Use Dataplex API for user-specific datasets
-                dataplex_url = await urls.gcp_service_url(DATAPLEX_SERVICE_NAME)
-                api_endpoint = (
-                    f"{dataplex_url}/v1/projects/{project_id}/locations/{location}/entryGroups/@bigquery/entries?filter=entry_type=projects/{BASE_PROJECT_ID}/locations/global/entryTypes/bigquery-dataset&pageSize={PAGE_SIZE_LIMIT}"
-                )
-                if page_token:
-                    api_endpoint += f"&pageToken={page_token}"
-            
+    async def get_json(self, api_endpoint, error_message):
+        """GETs and parses a JSON response, raising on a non-200 status.
+
+        Identical GETs issued while one is in flight share its upstream call
+        and its parsed result, which callers must therefore not modify.
+        """
+        key = (api_endpoint, self._access_token)
+        pending = self._in_flight.get(key)
+        if pending is None:
+            self.upstream_calls += 1
+            pending = asyncio.ensure_future(self._get_json(api_endpoint, error_message))
+            self._in_flight[key] = pending
+            pending.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced_calls += 1
+        return await asyncio.shield(pending)
+
+    async def _get_json(self, api_endpoint, error_message):
+        async def send():
             async with self.client_session.get(
                 api_endpoint, headers=self.create_headers()
             ) as response:
-                if response.status == 200:
-                    resp = await response.json()
-                    return resp
-                else:
-                    raise Exception(
-                        f"Error response from BigQuery: {response.reason} {await response.text()}"
-                    )
+                await retry.raise_for_status(response, error_message)
+                return await response.json()
+
+        return await retry.policy.run(api_endpoint, send)
+
+    def stats(self):
+        return {
+            "upstream_calls": self.upstream_calls,
+            "coalesced_calls": self.coalesced_calls,
+        }
+
+    async def stream(self, api_endpoint, error_message):
+        """Yields the body of a GET request in chunks, without parsing it.
+
+        A non-200 response raises before anything is yielded. Transient
+        errors are retried as long as nothing has been yielded yet.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            await retry.policy.acquire(api_endpoint, attempt)
+            yielded = False
+            try:
+                async with self.client_session.get(
+                    api_endpoint, headers=self.create_headers()
+                ) as response:
+                    await retry.raise_for_status(response, error_message)
+                    async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                        yielded = True
+                        yield chunk
+            except (retry.RetryableError, aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = None if yielded else retry.policy.retry_delay(attempt, e)
+                if delay is None:
+                    retry.policy.record(api_endpoint, started, attempt, True)
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except Exception:
+                retry.policy.record(api_endpoint, started, attempt, True)
+                raise
+            retry.policy.record(api_endpoint, started, attempt, False)
+            return
+
+    async def datasets_endpoint(self, page_token, project_id, location):
+        if project_id == BQ_PUBLIC_DATASET_PROJECT_ID:
+            # Use BigQuery API for public datasets
+            bigquery_url = await self.service_url(BIGQUERY_SERVICE_NAME)
+            api_endpoint = f"{bigquery_url}bigquery/v2/projects/{BQ_PUBLIC_DATASET_PROJECT_ID}/datasets?maxResults={PAGE_SIZE_LIMIT}"
+        else:
+            # Use Dataplex API for user-specific datasets
+            dataplex_url = await self.service_url(DATAPLEX_SERVICE_NAME)
+            api_endpoint = (
+                f"{dataplex_url}/v1/projects/{project_id}/locations/{location}/entryGroups/@bigquery/entries?filter=entry_type=projects/{BASE_PROJECT_ID}/locations/global/entryTypes/bigquery-dataset&pageSize={PAGE_SIZE_LIMIT}"
+            )
+        if page_token:
+            api_endpoint += f"&pageToken={page_token}"
+        return api_endpoint
+
+    async def tables_endpoint(self, dataset_id, page_token, project_id):
+        bigquery_url = await self.service_url(BIGQUERY_SERVICE_NAME)
+        return f"{bigquery_url}bigquery/v2/projects/{project_id}/datasets/{dataset_id}/tables?pageToken={page_token}"
+
+    async def dataset_info_endpoint(self, dataset_id, project_id):
+        bigquery_url = await self.service_url(BIGQUERY_SERVICE_NAME)
+        return f"{bigquery_url}bigquery/v2/projects/{project_id}/datasets/{dataset_id}"
+
+    async def table_info_endpoint(self, dataset_id, table_id, project_id):
+        bigquery_url = await self.service_url(BIGQUERY_SERVICE_NAME)
+        return f"{bigquery_url}bigquery/v2/projects/{project_id}/datasets/{dataset_id}/tables/{table_id}"
+
+    async def preview_data_endpoint(
+        self, dataset_id, table_id, max_results, start_index, project_id, selected_fields=None
+    ):
+        bigquery_url = await self.service_url(BIGQUERY_SERVICE_NAME)
+        api_endpoint = f"{bigquery_url}bigquery/v2/projects/{project_id}/datasets/{dataset_id}/tables/{table_id}/data?maxResults={max_results}&startIndex={start_index}"
+        if selected_fields:
+            api_endpoint += f"&selectedFields={selected_fields}"
+        return api_endpoint
+
+    async def list_datasets(self, page_token, project_id, location):
+        try:
+            api_endpoint = await self.datasets_endpoint(page_token, project_id, location)
+            return await self.get_json(api_endpoint, "Error response from BigQuery")
         except Exception as e:
             self.log.exception("Error fetching datasets list")
             return {"error": str(e)}
 
     async def list_table(self, dataset_id, page_token, project_id):
         try:
-            bigquery_url = await urls.gcp_service_url(BIGQUERY_SERVICE_NAME)
-            api_endpoint = f"{bigquery_url}bigquery/v2/projects/{project_id}/datasets/{dataset_id}/tables?pageToken={page_token}"
-            async with self.client_session.get(
-                api_endpoint, headers=self.create_headers()
-            ) as response:
-                if response.status == 200:
-                    resp = await response.json()
-                    return resp
-                else:
-                    raise Exception(
-                        f"Error listing BigQuery tables: {response.reason} {await response.text()}"
-                    )
+            api_endpoint = await self.tables_endpoint(dataset_id, page_token, project_id)
+            return await self.get_json(api_endpoint, "Error listing BigQuery tables")
         except Exception as e:
             self.log.exception("Error fetching tables list")
             return {"error": str(e)}
 
     async def list_dataset_info(self, dataset_id, project_id):
         try:
-            bigquery_url = await urls.gcp_service_url(BIGQUERY_SERVICE_NAME)
-            api_endpoint = (
-                f"{bigquery_url}bigquery/v2/projects/{project_id}/datasets/{dataset_id}"
-            )
-            async with self.client_session.get(
-                api_endpoint, headers=self.create_headers()
-            ) as response:
-                if response.status == 200:
-                    resp = await response.json()
-                    return resp
-                else:
-                    raise Exception(
-                        f"Error listing BigQuery dataset info: {response.reason} {await response.text()}"
-                    )
+            api_endpoint = await self.dataset_info_endpoint(dataset_id, project_id)
+            return await self.get_json(api_endpoint, "Error listing BigQuery dataset info")
         except Exception as e:
             self.log.exception("Error fetching dataset info")
             return {"error": str(e)}
 
     async def list_table_info(self, dataset_id, table_id, project_id):
         try:
-            bigquery_url = await urls.gcp_service_url(BIGQUERY_SERVICE_NAME)
-            api_endpoint = f"{bigquery_url}bigquery/v2/projects/{project_id}/datasets/{dataset_id}/tables/{table_id}"
-            async with self.client_session.get(
-                api_endpoint, headers=self.create_headers()
-            ) as response:
-                if response.status == 200:
-                    resp = await response.json()
-                    return resp
-                else:
-                    raise Exception(
-                        f"Error listing BigQuery table info: {response.reason} {await response.text()}"
-                    )
+            api_endpoint = await self.table_info_endpoint(dataset_id, table_id, project_id)
+            return await self.get_json(api_endpoint, "Error listing BigQuery table info")
         except Exception as e:
             self.log.exception(f"Error fetching table information")
             return {"error": str(e)}
 
     async def bigquery_preview_data(
-        self, dataset_id, table_id, max_results, start_index, project_id
+        self, dataset_id, table_id, max_results, start_index, project_id, selected_fields=None
+    ):
+        """Returns a page of table rows, served from `preview_cache` when possible.
+
+        The table's `lastModifiedTime`, read through `metadata_cache`, decides
+        whether previously fetched rows are still valid.
+        """
+        table_info, _ = await metadata_cache.get_or_fetch(
+            MetadataCache.key(
+                "table_info", project_id, dataset_id=dataset_id, table_id=table_id
+            ),
+            lambda: self.list_table_info(dataset_id, table_id, project_id),
+        )
+        last_modified = table_info.get("lastModifiedTime")
+        if not last_modified:
+            # Without it cached rows can't be validated, so skip the cache.
+            return await self._fetch_preview_data(
+                dataset_id, table_id, max_results, start_index, project_id, selected_fields
+            )
+        key = RowWindowCache.key(project_id, dataset_id, table_id, selected_fields)
+        start_index, max_results = int(start_index), int(max_results)
+        cached = preview_cache.get(key, last_modified, start_index, max_results)
+        if cached is not None:
+            return cached
+        preview_data = await self._fetch_preview_data(
+            dataset_id, table_id, max_results, start_index, project_id, selected_fields
+        )
+        preview_cache.put(key, last_modified, start_index, preview_data)
+        return preview_data
+
+    async def _fetch_preview_data(
+        self, dataset_id, table_id, max_results, start_index, project_id, selected_fields
     ):
         try:
-            bigquery_url = await urls.gcp_service_url(BIGQUERY_SERVICE_NAME)
-            api_endpoint = f"{bigquery_url}bigquery/v2/projects/{project_id}/datasets/{dataset_id}/tables/{table_id}/data?maxResults={max_results}&startIndex={start_index}"
-            async with self.client_session.get(
-                api_endpoint, headers=self.create_headers()
-            ) as response:
-                if response.status == 200:
-                    resp = await response.json()
-                    return resp
-                else:
-                    raise Exception(
-                        f"Error displaying BigQuery preview data: {response.reason} {await response.text()}"
-                    )
+            api_endpoint = await self.preview_data_endpoint(
+                dataset_id, table_id, max_results, start_index, project_id, selected_fields
+            )
+            return await self.get_json(api_endpoint, "Error displaying BigQuery preview data")
         except Exception as e:
             self.log.exception("Error fetching preview data")
             return {"error": str(e)}
 
-    async def bigquery_search(self, search_string: str, type: str, system: str, projects: list):
+    async def search_pages(
+        self, search_string: str, type: str, system: str, projects: list, max_results=None
+    ):
+        """Yields BigQuery data assets found by the Dataplex API, one page at a time.
+
+        Iteration stops after `max_results` results when given, so callers
+        that only need the first results pay for as few round trips as needed.
+        """
+        dataplex_url = await self.service_url(DATAPLEX_SERVICE_NAME)
+        api_endpoint = f"{dataplex_url}v1/projects/{self.project_id}/locations/global:searchEntries"
+
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self._access_token}",
+            "X-Goog-User-Project": self.project_id,
+        }
+
+        query_parts = []
+        if search_string:
+            query_parts.append(f"{search_string}")
+        if system:
+            query_parts.append(f"system={system.upper()}")
+        if type:
+            type_filters = " OR ".join([f"type={t.upper()}" for t in type.split('|')])
+            query_parts.append(f"({type_filters})")
+        if projects:
+            project_filters = " OR ".join([f"projectid={p}" for p in projects])
+            query_parts.append(f"({project_filters})")
+
+        full_query = " AND ".join(filter(None, query_parts))
+
+        if not full_query:
+            self.log.warning("No search query provided. Returning empty result.")
+            return
+
+        payload = {
+            "query": full_query,
+            "pageSize": SEARCH_PAGE_SIZE,
+        }
+        remaining = max_results
+
+        while remaining is None or remaining > 0:
+            if remaining is not None:
+                payload["pageSize"] = min(SEARCH_PAGE_SIZE, remaining)
+            async def send():
+                async with self.client_session.post(
+                    api_endpoint, headers=headers, json=payload
+                ) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    response_text = await response.text()
+                    self.log.error(f"Error searching in Dataplex: {response.status} - {response_text}")
+                    message = f"Dataplex API Error: {response.status} - {response.reason} - {response_text}"
+                    if response.status in retry.RETRYABLE_STATUSES:
+                        raise retry.RetryableError(
+                            message,
+                            retry.parse_retry_after(response.headers.get("Retry-After")),
+                        )
+                    raise Exception(message)
+
+            try:
+                resp = await retry.policy.run(api_endpoint, send)
+            except aiohttp.ClientError as e:
+                self.log.error(f"Aiohttp client error during API call: {e}")
+                raise
+
+            results = resp.get("results", [])
+            if remaining is not None:
+                results = results[:remaining]
+                remaining -= len(results)
+            if results:
+                yield results
+
+            if "nextPageToken" not in resp:
+                return
+            payload["pageToken"] = resp["nextPageToken"]
+
+    async def bigquery_search(
+        self, search_string: str, type: str, system: str, projects: list, max_results=None
+    ):
         """Searches for BigQuery data assets using the Dataplex API."""
         try:
-            dataplex_url = await urls.gcp_service_url(DATAPLEX_SERVICE_NAME)
-            api_endpoint = f"{dataplex_url}v1/projects/{self.project_id}/locations/global:searchEntries"
-            
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self._access_token}",
-                "X-Goog-User-Project": self.project_id,
-            }
-
-            query_parts = []
-            if search_string:
-                query_parts.append(f"{search_string}")
-            if system:
-                query_parts.append(f"system={system.upper()}")
-            if type:
-                type_filters = " OR ".join([f"type={t.upper()}" for t in type.split('|')])
-                query_parts.append(f"({type_filters})")
-            if projects:
-                project_filters = " OR ".join([f"projectid={p}" for p in projects])
-                query_parts.append(f"({project_filters})")
-
-            full_query = " AND ".join(filter(None, query_parts))
-            
-            if not full_query:
-                self.log.warning("No search query provided. Returning empty result.")
-                return {}
-
-            payload = {
-                "query": full_query,
-                "pageSize": 500,
-            }
-            
-            has_next = True
             search_results = []
-            
-            # Handle pagination to retrieve all results.
-            while has_next:
-                try:
-                    async with self.client_session.post(
-                        api_endpoint, headers=headers, json=payload
-                    ) as response:
-                        if response.status == 200:
-                            resp = await response.json()
-                            if "results" in resp:
-                                search_results.extend(resp["results"])
-
-                            if "nextPageToken" in resp:
-                                payload["pageToken"] = resp["nextPageToken"]
-                            else:
-                                has_next = False
-                        else:
-                            response_text = await response.text()
-                            self.log.error(f"Error searching in Dataplex: {response.status} - {response_text}")
-                            raise Exception(f"Dataplex API Error: {response.status} - {response.reason} - {response_text}")
-
-                except aiohttp.ClientError as e:
-                    self.log.error(f"Aiohttp client error during API call: {e}")
-                    raise
+            async for page in self.search_pages(
+                search_string, type, system, projects, max_results
+            ):
+                search_results.extend(page)
 
             if not search_results:
                 return {}
@@ -228,20 +702,11 @@ class Client:
 
     async def bigquery_projects(self, dataset_id, table_id):
         try:
-            cloudresourcemanager_url = await urls.gcp_service_url(
+            cloudresourcemanager_url = await self.service_url(
                 CLOUDRESOURCEMANAGER_SERVICE_NAME
             )
             api_endpoint = f"{cloudresourcemanager_url}v1/projects"
-            async with self.client_session.get(
-                api_endpoint, headers=self.create_headers()
-            ) as response:
-                if response.status == 200:
-                    resp = await response.json()
-                    return resp
-                else:
-                    raise Exception(
-                        f"Error listing BigQuery projects: {response.reason} {await response.text()}"
-                    )
+            return await self.get_json(api_endpoint, "Error listing BigQuery projects")
         except Exception as e:
             self.log.exception("Error fetching projects")
             return {"error": str(e)}
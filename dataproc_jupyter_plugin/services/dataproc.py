@@ -0,0 +1,712 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import base64
+import itertools
+import json
+import logging
+import time
+import urllib.parse
+
+from dataproc_jupyter_plugin import credentials, urls
+from dataproc_jupyter_plugin.commons import http_session, retry
+from dataproc_jupyter_plugin.commons.constants import (
+    CONTENT_TYPE,
+    DATAPROC_BATCH_FULL_SYNC_INTERVAL,
+    DATAPROC_BATCH_STORE_MAX,
+    DATAPROC_BATCH_SYNC_INTERVAL,
+    DATAPROC_JOBS_CONCURRENCY,
+    DATAPROC_JOBS_MAX_PER_CLUSTER,
+    DATAPROC_LIST_MAX_ITEMS,
+    DATAPROC_LIST_PAGE_SIZE,
+    DATAPROC_WATCH_FAST_INTERVAL,
+    DATAPROC_WATCH_INTERVAL,
+    DATAPROC_WATCH_MAX_INTERVAL,
+    DATAPROC_WATCH_QUEUE_SIZE,
+)
+from dataproc_jupyter_plugin.services.inventory import inventory
+
+# Resource kinds listed by the watcher: path under the project, response
+# field holding the items, how to identify an item, and its state.
+RESOURCE_KINDS = {
+    "clusters": (
+        "regions/{region_id}/clusters",
+        "clusters",
+        lambda cluster: cluster.get("clusterName"),
+        lambda cluster: cluster.get("status", {}).get("state"),
+    ),
+    "batches": (
+        "locations/{region_id}/batches?orderBy=create_time desc",
+        "batches",
+        lambda batch: batch.get("name"),
+        lambda batch: batch.get("state"),
+    ),
+    "sessions": (
+        "locations/{region_id}/sessions",
+        "sessions",
+        lambda session: session.get("name"),
+        lambda session: session.get("state"),
+    ),
+    "sessionTemplates": (
+        "locations/{region_id}/sessionTemplates",
+        "sessionTemplates",
+        lambda template: template.get("name"),
+        lambda template: None,
+    ),
+    "jobs": (
+        "regions/{region_id}/jobs",
+        "jobs",
+        lambda job: job.get("reference", {}).get("jobId"),
+        lambda job: job.get("status", {}).get("state"),
+    ),
+}
+
+# States a resource only passes through, which the watcher polls for quickly.
+TRANSITIONAL_STATES = {
+    "CREATING",
+    "STARTING",
+    "UPDATING",
+    "STOPPING",
+    "DELETING",
+    "REPAIRING",
+    "PENDING",
+    "SETUP_DONE",
+    "CANCELLING",
+    "CANCEL_PENDING",
+    "CANCEL_STARTED",
+    "TERMINATING",
+}
+
+# Batch states that can still change.
+BATCH_ACTIVE_STATES = ("PENDING", "RUNNING", "CANCELLING")
+
+
+class Client:
+    def __init__(self, credentials, log, client_session):
+        self.log = log
+        if not (
+            ("access_token" in credentials)
+            and ("project_id" in credentials)
+            and ("region_id" in credentials)
+        ):
+            self.log.exception("Missing required credentials")
+            raise ValueError("Missing required credentials")
+        self._access_token = credentials["access_token"]
+        self.project_id = credentials["project_id"]
+        self.region_id = credentials["region_id"]
+        self.client_session = client_session
+
+    def create_headers(self):
+        return {
+            "Content-Type": CONTENT_TYPE,
+            "Authorization": f"Bearer {self._access_token}",
+        }
+
+    async def get_json(self, api_endpoint, error_message):
+        async def send():
+            async with self.client_session.get(
+                api_endpoint, headers=self.create_headers()
+            ) as response:
+                await retry.raise_for_status(response, error_message)
+                return await response.json()
+
+        return await retry.policy.run(api_endpoint, send)
+
+    async def list_resources(
+        self, kind, project_id, region_id, max_items=DATAPROC_LIST_MAX_ITEMS, params=None
+    ):
+        """Returns up to `max_items` resources of a kind, following page tokens.
+
+        `params` holds extra query parameters, such as a `filter`.
+        """
+        path, field = RESOURCE_KINDS[kind][:2]
+        dataproc_url = (await urls.map())["dataproc_url"]
+        base_endpoint = f"{dataproc_url}v1/projects/{project_id}/{path.format(region_id=region_id)}"
+        for name, value in (params or {}).items():
+            separator = "&" if "?" in base_endpoint else "?"
+            base_endpoint += f"{separator}{name}={urllib.parse.quote(value)}"
+        separator = "&" if "?" in base_endpoint else "?"
+        items = []
+        page_token = ""
+        while len(items) < max_items:
+            api_endpoint = f"{base_endpoint}{separator}pageSize={DATAPROC_LIST_PAGE_SIZE}"
+            if page_token:
+                api_endpoint += f"&pageToken={page_token}"
+            resp = await self.get_json(api_endpoint, f"Error listing Dataproc {kind}")
+            items.extend(resp.get(field, []))
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                break
+        return items[:max_items]
+
+    async def list_cluster_jobs(self, project_id, region_id, cluster_names):
+        """Returns `{cluster_name: jobs or exception}` for the given clusters.
+
+        At most `DATAPROC_JOBS_CONCURRENCY` clusters are listed at a time.
+        """
+        semaphore = asyncio.Semaphore(DATAPROC_JOBS_CONCURRENCY)
+
+        async def list_jobs(cluster_name):
+            async with semaphore:
+                return await self.list_resources(
+                    "jobs",
+                    project_id,
+                    region_id,
+                    max_items=DATAPROC_JOBS_MAX_PER_CLUSTER,
+                    params={"clusterName": cluster_name},
+                )
+
+        results = await asyncio.gather(
+            *[list_jobs(cluster_name) for cluster_name in cluster_names],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+        return dict(zip(cluster_names, results))
+
+    async def get_resource(self, name):
+        """Returns a resource by its full name, e.g. `projects/p/locations/r/batches/b`."""
+        dataproc_url = (await urls.map())["dataproc_url"]
+        return await self.get_json(
+            f"{dataproc_url}v1/{name}", f"Error fetching Dataproc resource {name}"
+        )
+
+
+class Subscription:
+    """A subscriber's queue of watcher events.
+
+    A subscriber that falls `DATAPROC_WATCH_QUEUE_SIZE` events behind has its
+    queue replaced by a single full snapshot.
+    """
+
+    def __init__(self, watch):
+        self.watch = watch
+        self.needs_snapshot = True
+        self._queue = asyncio.Queue(maxsize=DATAPROC_WATCH_QUEUE_SIZE)
+
+    def push(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(self.watch.snapshot_event())
+
+    def close(self):
+        """Makes the next `get()` return None."""
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def get(self):
+        return await self._queue.get()
+
+
+class ResourceWatch:
+    """Polls the Dataproc resources of one project and region for its subscribers.
+
+    Resource kinds are polled only while someone is subscribed, each on its
+    own schedule: every `fast_interval` seconds while any of its resources
+    is in a transitional state, every `interval` seconds after a change or
+    error, and otherwise backing off exponentially up to `max_interval`.
+    `refresh()` polls kinds right away, e.g. after the user acted on them.
+
+    Each subscriber first receives a full `snapshot` event, then one
+    `changes` event per kind whose resources were added, changed or removed,
+    and an `error` event when listing a kind starts failing.
+
+    A new watch starts from the persisted inventory, if any: its snapshot is
+    marked `stale` and sent to subscribers right away, and a fresh snapshot
+    follows the first poll. Every change is saved back to the inventory.
+    """
+
+    def __init__(
+        self,
+        project_id,
+        region_id,
+        interval=DATAPROC_WATCH_INTERVAL,
+        fast_interval=DATAPROC_WATCH_FAST_INTERVAL,
+        max_interval=DATAPROC_WATCH_MAX_INTERVAL,
+    ):
+        self.project_id = project_id
+        self.region_id = region_id
+        self.interval = interval
+        self.fast_interval = fast_interval
+        self.max_interval = max_interval
+        self.resources = {kind: {} for kind in RESOURCE_KINDS}
+        self.errors = {}
+        self.stale = False
+        self.saved_at = None
+        saved = inventory.get(project_id, region_id)
+        if saved:
+            for kind, items in saved["resources"].items():
+                if kind in RESOURCE_KINDS:
+                    self._apply(kind, items)
+            self.stale = True
+            self.saved_at = saved["saved_at"]
+        self.intervals = {kind: interval for kind in RESOURCE_KINDS}
+        self.polls = 0
+        self.subscribers = set()
+        self._due = {kind: 0.0 for kind in RESOURCE_KINDS}
+        self._wakeup = asyncio.Event()
+        self._polled = asyncio.Event()
+        self._task = None
+
+    def subscribe(self):
+        subscription = Subscription(self)
+        if self.polls or self.stale:
+            subscription.push(self.snapshot_event())
+            subscription.needs_snapshot = False
+        self.subscribers.add(subscription)
+        if self._task is None or self._task.done():
+            # Resources may have changed at any pace while nobody watched.
+            self.refresh()
+            self._task = asyncio.ensure_future(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot_event(self):
+        return {
+            "type": "snapshot",
+            "project_id": self.project_id,
+            "region_id": self.region_id,
+            "resources": {
+                kind: list(resources.values())
+                for kind, resources in self.resources.items()
+            },
+            "errors": dict(self.errors),
+            "stale": self.stale,
+            "saved_at": self.saved_at,
+        }
+
+    async def wait_polled(self):
+        """Waits until the watch has polled once, or stopped polling."""
+        if self._task is None:
+            return
+        waiter = asyncio.ensure_future(self._polled.wait())
+        try:
+            await asyncio.wait({waiter, self._task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+
+    def refresh(self, kinds=None):
+        """Makes the given kinds, or all of them, due for polling now."""
+        for kind in kinds or RESOURCE_KINDS:
+            self._due[kind] = 0.0
+        self._wakeup.set()
+
+    async def _run(self):
+        while self.subscribers:
+            now = time.monotonic()
+            due = [kind for kind, due_at in self._due.items() if due_at <= now]
+            if due:
+                try:
+                    await self.poll(due)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    logging.exception("Error polling Dataproc resources")
+                    for kind in due:
+                        self._schedule(kind, self.interval)
+            self._wakeup.clear()
+            delay = min(self._due.values()) - time.monotonic()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _schedule(self, kind, interval):
+        self.intervals[kind] = interval
+        self._due[kind] = time.monotonic() + interval
+
+    def _next_interval(self, kind, changed):
+        state = RESOURCE_KINDS[kind][3]
+        if any(
+            state(item) in TRANSITIONAL_STATES for item in self.resources[kind].values()
+        ):
+            return self.fast_interval
+        if changed or kind in self.errors:
+            return self.interval
+        return min(max(self.intervals[kind], self.interval) * 2, self.max_interval)
+
+    async def list_kinds(self, kinds):
+        """Returns `{kind: items or exception}` for the given kinds."""
+        cached = await credentials.get_cached()
+        client = Client(cached, logging.getLogger(__name__), http_session.manager.get())
+        results = await asyncio.gather(
+            *[
+                client.list_resources(kind, self.project_id, self.region_id)
+                for kind in kinds
+            ],
+            return_exceptions=True,
+        )
+        return dict(zip(kinds, results))
+
+    async def poll(self, kinds=None):
+        try:
+            results = await self.list_kinds(list(kinds or RESOURCE_KINDS))
+        finally:
+            self._polled.set()
+        self.polls += 1
+        events = []
+        for kind, result in results.items():
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception):
+                if self.errors.get(kind) != str(result):
+                    self.errors[kind] = str(result)
+                    events.append({"type": "error", "kind": kind, "error": str(result)})
+                self._schedule(kind, self._next_interval(kind, False))
+                continue
+            self.errors.pop(kind, None)
+            event = self._apply(kind, result)
+            if event:
+                events.append(event)
+            self._schedule(kind, self._next_interval(kind, event is not None))
+        reconciled = self.stale and set(results) == set(RESOURCE_KINDS)
+        if reconciled:
+            self.stale = False
+            self.saved_at = None
+            for subscription in self.subscribers:
+                subscription.needs_snapshot = True
+        if events or reconciled:
+            inventory.put(
+                self.project_id,
+                self.region_id,
+                {kind: list(resources.values()) for kind, resources in self.resources.items()},
+            )
+        self._publish(events)
+        return events
+
+    def _apply(self, kind, items):
+        """Stores a kind's new listing, returning a `changes` event or None."""
+        key = RESOURCE_KINDS[kind][2]
+        previous = self.resources[kind]
+        current = {key(item): item for item in items if key(item)}
+        upserted = [
+            item for item_id, item in current.items() if previous.get(item_id) != item
+        ]
+        removed = [item_id for item_id in previous if item_id not in current]
+        self.resources[kind] = current
+        if not upserted and not removed:
+            return None
+        return {"type": "changes", "kind": kind, "upserted": upserted, "removed": removed}
+
+    def _publish(self, events):
+        for subscription in self.subscribers:
+            if subscription.needs_snapshot:
+                subscription.push(self.snapshot_event())
+                subscription.needs_snapshot = False
+                continue
+            for event in events:
+                subscription.push(event)
+
+
+class ResourceWatcher:
+    """Shares one `ResourceWatch` per project and region between all subscribers."""
+
+    def __init__(self):
+        self._watches = {}
+        self._reconciling = {}
+
+    def subscribe(self, project_id, region_id):
+        watch = self._watches.get((project_id, region_id))
+        if watch is None:
+            watch = self._watches[(project_id, region_id)] = ResourceWatch(
+                project_id, region_id
+            )
+        return watch.subscribe()
+
+    async def snapshot(self, project_id, region_id):
+        """Returns a `snapshot` event for a project and region without subscribing.
+
+        A persisted inventory is returned at once, marked `stale`, and unless
+        saved in the last `DATAPROC_WATCH_INTERVAL` seconds is reconciled by a
+        poll in the background. Without one, the poll is waited for.
+        """
+        key = (project_id, region_id)
+        watch = self._watches.get(key)
+        if watch is not None:
+            # Subscribed watches reconcile themselves; rather than polling
+            # again, wait for the first poll unless there is a stale snapshot.
+            if not (watch.polls or watch.stale):
+                await watch.wait_polled()
+            return watch.snapshot_event()
+        watch = ResourceWatch(project_id, region_id)
+        reconcile = self._reconciling.get(key)
+        if reconcile is None and not (
+            watch.stale and time.time() - watch.saved_at < DATAPROC_WATCH_INTERVAL
+        ):
+            reconcile = self._reconciling[key] = asyncio.ensure_future(
+                self._reconcile(key, watch)
+            )
+        if watch.stale:
+            return watch.snapshot_event()
+        return await asyncio.shield(reconcile)
+
+    async def _reconcile(self, key, watch):
+        try:
+            await watch.poll()
+            return watch.snapshot_event()
+        finally:
+            self._reconciling.pop(key, None)
+
+    def refresh(self, project_id, region_id, kinds=None):
+        """Polls a watched project and region right away; a no-op if unwatched."""
+        watch = self._watches.get((project_id, region_id))
+        if watch is not None:
+            watch.refresh(kinds)
+
+    def unsubscribe(self, subscription):
+        watch = subscription.watch
+        watch.unsubscribe(subscription)
+        if not watch.subscribers:
+            self._watches.pop((watch.project_id, watch.region_id), None)
+
+    def stats(self):
+        return {
+            f"{project_id}/{region_id}": {
+                "subscribers": len(watch.subscribers),
+                "polls": watch.polls,
+                "intervals": dict(watch.intervals),
+            }
+            for (project_id, region_id), watch in self._watches.items()
+        }
+
+    async def close(self):
+        for watch in list(self._watches.values()):
+            for subscription in list(watch.subscribers):
+                watch.unsubscribe(subscription)
+        self._watches.clear()
+        for reconcile in list(self._reconciling.values()):
+            reconcile.cancel()
+        await inventory.close()
+
+
+watcher = ResourceWatcher()
+
+
+def index_jobs(results):
+    """Merges `list_cluster_jobs` results into one listing indexed by cluster and state.
+
+    Jobs are ordered by their latest state change, newest first, and
+    referenced by job ID in the `byCluster` and `byState` indexes.
+    """
+    jobs = []
+    by_cluster = {}
+    by_state = {}
+    errors = {}
+    for cluster_name, result in sorted(results.items()):
+        if isinstance(result, Exception):
+            errors[cluster_name] = str(result)
+            continue
+        by_cluster[cluster_name] = []
+        for job in result:
+            job_id = RESOURCE_KINDS["jobs"][2](job)
+            by_cluster[cluster_name].append(job_id)
+            by_state.setdefault(RESOURCE_KINDS["jobs"][3](job), []).append(job_id)
+            jobs.append(job)
+    jobs.sort(
+        key=lambda job: (
+            job.get("status", {}).get("stateStartTime", ""),
+            RESOURCE_KINDS["jobs"][2](job) or "",
+        ),
+        reverse=True,
+    )
+    return {"jobs": jobs, "byCluster": by_cluster, "byState": by_state, "errors": errors}
+
+
+def _create_time_key(batch):
+    """Makes UTC RFC 3339 create times of any precision compare as strings."""
+    seconds, _, fraction = batch.get("createTime", "").rstrip("Z").partition(".")
+    return f"{seconds}.{fraction.ljust(9, '0')}"
+
+
+def _batch_order_key(batch):
+    return (_create_time_key(batch), batch["name"])
+
+
+def encode_page_token(batch):
+    return base64.urlsafe_b64encode(
+        json.dumps(_batch_order_key(batch)).encode("utf-8")
+    ).decode("ascii")
+
+
+def decode_page_token(page_token):
+    """Returns the order key a page token continues after; raises ValueError."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(page_token.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Invalid page token: {page_token}") from e
+    if not (isinstance(key, list) and len(key) == 2 and all(isinstance(k, str) for k in key)):
+        raise ValueError(f"Invalid page token: {page_token}")
+    return tuple(key)
+
+
+class BatchStore:
+    """The batches of one project and region, newest first, synced incrementally.
+
+    The first sync, and one every `DATAPROC_BATCH_FULL_SYNC_INTERVAL` seconds
+    (which also drops deleted batches), lists up to `DATAPROC_BATCH_STORE_MAX`
+    batches. Other syncs only list batches created at or after the newest
+    one stored (so batches created in the same instant are not missed), and
+    batches in an active state; stored active batches missing
+    from the latter have finished and are fetched one by one. Syncs less than
+    `DATAPROC_BATCH_SYNC_INTERVAL` seconds apart reuse the previous one.
+    """
+
+    def __init__(self, project_id, region_id):
+        self.project_id = project_id
+        self.region_id = region_id
+        self.batches = {}
+        self.synced_at = None
+        self.full_synced_at = None
+        self.syncs = 0
+        self.full_syncs = 0
+        self._sorted = []
+        self._lock = asyncio.Lock()
+
+    async def sync(self, client, force=False):
+        async with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self.synced_at is not None
+                and now - self.synced_at < DATAPROC_BATCH_SYNC_INTERVAL
+            ):
+                return
+            if (
+                not self.batches
+                or self.full_synced_at is None
+                or now - self.full_synced_at >= DATAPROC_BATCH_FULL_SYNC_INTERVAL
+            ):
+                batches = await self._list(client)
+                self.batches = {}
+                self._update(batches)
+                self.full_synced_at = now
+                self.full_syncs += 1
+            else:
+                await self._sync_changes(client)
+            self.synced_at = now
+            self.syncs += 1
+            self._sorted = sorted(self.batches.values(), key=_batch_order_key, reverse=True)
+            for batch in self._sorted[DATAPROC_BATCH_STORE_MAX:]:
+                del self.batches[batch["name"]]
+            del self._sorted[DATAPROC_BATCH_STORE_MAX:]
+
+    async def _list(self, client, filter_expr=None):
+        return await client.list_resources(
+            "batches",
+            self.project_id,
+            self.region_id,
+            max_items=DATAPROC_BATCH_STORE_MAX,
+            params={"filter": filter_expr} if filter_expr else None,
+        )
+
+    async def _sync_changes(self, client):
+        newest = max(self.batches.values(), key=_batch_order_key)
+        active = [
+            name
+            for name, batch in self.batches.items()
+            if batch.get("state") in BATCH_ACTIVE_STATES
+        ]
+        created, still_active = await asyncio.gather(
+            self._list(client, f'create_time >= "{newest["createTime"]}"'),
+            self._list(
+                client, " OR ".join(f"state = {state}" for state in BATCH_ACTIVE_STATES)
+            ),
+        )
+        self._update(itertools.chain(created, still_active))
+        returned = {batch.get("name") for batch in still_active}
+        finished = [name for name in active if name not in returned]
+        results = await asyncio.gather(
+            *[client.get_resource(name) for name in finished], return_exceptions=True
+        )
+        for name, result in zip(finished, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, Exception):
+                # Likely deleted; the next full sync drops it if so.
+                logging.debug(f"Error refreshing batch {name}: {result}")
+                continue
+            self._update([result])
+
+    def _update(self, batches):
+        for batch in batches:
+            if batch.get("name"):
+                self.batches[batch["name"]] = batch
+
+    def page(self, page_size, page_token=None, states=None, search=None, ascending=False):
+        """Returns a page of stored batches shaped like the `batches.list` response.
+
+        `page_token` is the `nextPageToken` of the previous page, which stays
+        valid when batches are created in between. Raises ValueError for an
+        invalid token.
+        """
+        batches = reversed(self._sorted) if ascending else iter(self._sorted)
+        if page_token:
+            after = decode_page_token(page_token)
+            if ascending:
+                batches = (b for b in batches if _batch_order_key(b) > after)
+            else:
+                batches = (b for b in batches if _batch_order_key(b) < after)
+        if states:
+            batches = (b for b in batches if b.get("state") in states)
+        if search:
+            search = search.lower()
+            batches = (b for b in batches if search in b["name"].rsplit("/", 1)[-1].lower())
+        page = list(itertools.islice(batches, page_size + 1))
+        response = {"batches": page[:page_size]}
+        if len(page) > page_size:
+            response["nextPageToken"] = encode_page_token(page[page_size - 1])
+        return response
+
+
+class BatchStores:
+    """One `BatchStore` per project and region."""
+
+    def __init__(self):
+        self._stores = {}
+
+    def get(self, project_id, region_id):
+        store = self._stores.get((project_id, region_id))
+        if store is None:
+            store = self._stores[(project_id, region_id)] = BatchStore(
+                project_id, region_id
+            )
+        return store
+
+    def invalidate(self):
+        self._stores.clear()
+
+    def stats(self):
+        return {
+            f"{project_id}/{region_id}": {
+                "batches": len(store.batches),
+                "syncs": store.syncs,
+                "full_syncs": store.full_syncs,
+            }
+            for (project_id, region_id), store in self._stores.items()
+        }
+
+
+batch_stores = BatchStores()
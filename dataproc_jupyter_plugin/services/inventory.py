@@ -0,0 +1,121 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+
+from jupyter_core.paths import jupyter_data_dir
+
+from dataproc_jupyter_plugin.commons.constants import (
+    DATAPROC_INVENTORY_MAX_LOCATIONS,
+    DATAPROC_INVENTORY_SAVE_DELAY,
+    PACKAGE_NAME,
+)
+
+
+class Inventory:
+    """The last known Dataproc resources per project and region, persisted to disk.
+
+    Saves are batched: the file is rewritten at most once per
+    `DATAPROC_INVENTORY_SAVE_DELAY` seconds, off the event loop, as gzipped
+    JSON. Only the `DATAPROC_INVENTORY_MAX_LOCATIONS` most recently saved
+    projects and regions are kept. The file is read once, by `configure()`
+    when the extension loads, so requests never wait on disk.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self._entries = {}
+        self._save_task = None
+
+    def configure(self, enabled, path=None):
+        self.enabled = enabled
+        self.path = path or os.path.join(
+            jupyter_data_dir(), PACKAGE_NAME, "inventory.json.gz"
+        )
+        self._entries = self._read() if enabled else {}
+
+    def _read(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable Dataproc inventory: {e}")
+            return {}
+
+    def get(self, project_id, region_id):
+        """Returns `{"saved_at", "resources"}` for a project and region, or None."""
+        return self._entries.get(f"{project_id}/{region_id}")
+
+    def put(self, project_id, region_id, resources):
+        """Records `{kind: [resource, ...]}` for a project and region."""
+        if not self.enabled:
+            return
+        entries = self._entries
+        key = f"{project_id}/{region_id}"
+        entries.pop(key, None)
+        entries[key] = {"saved_at": time.time(), "resources": resources}
+        for old_key in list(entries)[:-DATAPROC_INVENTORY_MAX_LOCATIONS]:
+            del entries[old_key]
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.ensure_future(self._save_later())
+
+    def clear(self):
+        self._entries = {}
+        if self._save_task is not None:
+            self._save_task.cancel()
+            self._save_task = None
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    async def _save_later(self):
+        await asyncio.sleep(DATAPROC_INVENTORY_SAVE_DELAY)
+        await self.flush()
+
+    async def flush(self):
+        """Writes the inventory now."""
+        if not self.path:
+            return
+        data = json.dumps(self._entries, separators=(",", ":"))
+        await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+
+    def _write(self, data):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            # The in-memory inventory still applies; persisting is best-effort.
+            logging.warning(f"Error saving Dataproc inventory: {e}")
+
+    async def close(self):
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+            self._save_task = None
+            await self.flush()
+
+
+inventory = Inventory()
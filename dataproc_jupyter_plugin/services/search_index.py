@@ -0,0 +1,217 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import sqlite3
+import time
+
+from jupyter_core.paths import jupyter_runtime_dir
+
+from dataproc_jupyter_plugin.commons.constants import (
+    PACKAGE_NAME,
+    SEARCH_INDEX_PRUNE_INTERVAL,
+    SEARCH_INDEX_TTL,
+    SEARCH_PAGE_SIZE,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    fqn TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    dataset_id TEXT NOT NULL,
+    table_id TEXT,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_project ON entries (project_id, type);
+CREATE INDEX IF NOT EXISTS entries_indexed_at ON entries (indexed_at);
+"""
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _dataset_refs(response):
+    """Yields (project_id, dataset_id) pairs from a `list_datasets` response.
+
+    Both the BigQuery (`datasets`) and Dataplex (`entries`) formats are handled.
+    """
+    for dataset in response.get("datasets", []):
+        reference = dataset.get("datasetReference", {})
+        if reference.get("projectId") and reference.get("datasetId"):
+            yield reference["projectId"], reference["datasetId"]
+    for entry in response.get("entries", []):
+        fqn = entry.get("fullyQualifiedName", "")
+        parts = fqn.split(":", 1)[-1].split(".")
+        if fqn.startswith("bigquery:") and len(parts) == 2:
+            yield parts[0], parts[1]
+
+
+def _table_refs(response):
+    """Yields (project_id, dataset_id, table_id) tuples from a `list_table` response."""
+    for table in response.get("tables", []):
+        reference = table.get("tableReference", {})
+        if reference.get("projectId") and reference.get("datasetId") and reference.get("tableId"):
+            yield reference["projectId"], reference["datasetId"], reference["tableId"]
+
+
+class SearchIndex:
+    """Local SQLite index of the BigQuery datasets and tables seen by the plugin.
+
+    The index is filled from the dataset explorer listings as they are served
+    and answers substring searches on dataset and table names locally. Entries
+    not refreshed within `SEARCH_INDEX_TTL` are ignored, and pruned at most
+    every `SEARCH_INDEX_PRUNE_INTERVAL`. Results are returned in the shape of
+    Dataplex `searchEntries` results.
+
+    All database work runs in order on a single background thread, so writes
+    never block the server and a search sees every write queued before it.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self._db = None
+        self._last_pruned = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="bigquery-search-index"
+        )
+
+    def configure(self, enabled, path=None):
+        self.close()
+        self.enabled = enabled
+        self.path = path or os.path.join(
+            jupyter_runtime_dir(), f"{PACKAGE_NAME}_search_index.sqlite"
+        )
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def close(self):
+        """Waits for queued writes, then closes the database."""
+        self._executor.submit(self._close).result()
+
+    def _close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    async def flush(self):
+        """Waits until every write queued so far has been applied."""
+        await asyncio.wrap_future(self._executor.submit(lambda: None))
+
+    def _submit(self, fn, *args):
+        if self.enabled:
+            self._executor.submit(fn, *args)
+
+    def _upsert(self, rows):
+        try:
+            db = self._connect()
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                now = time.time()
+                if now - self._last_pruned >= SEARCH_INDEX_PRUNE_INTERVAL:
+                    db.execute(
+                        "DELETE FROM entries WHERE indexed_at < ?",
+                        (now - SEARCH_INDEX_TTL,),
+                    )
+                    self._last_pruned = now
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Error updating BigQuery search index: {e}")
+
+    def clear(self):
+        """Drops every indexed entry, e.g. after the account or project changes."""
+        self._submit(self._clear)
+
+    def _clear(self):
+        try:
+            with self._connect() as db:
+                db.execute("DELETE FROM entries")
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Error clearing BigQuery search index: {e}")
+
+    def add_datasets(self, response):
+        now = time.time()
+        rows = [
+            (f"bigquery:{project_id}.{dataset_id}", project_id, dataset_id, None,
+             "dataset", dataset_id, dataset_id.lower(), now)
+            for project_id, dataset_id in _dataset_refs(response)
+        ]
+        if rows:
+            self._submit(self._upsert, rows)
+
+    def add_tables(self, response):
+        now = time.time()
+        rows = [
+            (f"bigquery:{project_id}.{dataset_id}.{table_id}", project_id, dataset_id,
+             table_id, "table", table_id, table_id.lower(), now)
+            for project_id, dataset_id, table_id in _table_refs(response)
+        ]
+        if rows:
+            self._submit(self._upsert, rows)
+
+    async def search(self, search_string, types, projects, limit=None):
+        """Returns matching entries, prefix matches first, or [] on a miss."""
+        if not self.enabled or not search_string:
+            return []
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._search, search_string, types, projects, limit
+        )
+
+    def _search(self, search_string, types, projects, limit):
+        term = search_string.strip().lower()
+        types = [t.strip("() ").lower() for t in types.split("|")] if types else []
+        query = (
+            "SELECT fqn, name FROM entries WHERE name_lower LIKE ? ESCAPE '\\' "
+            "AND indexed_at >= ?"
+        )
+        params = [f"%{_escape_like(term)}%", time.time() - SEARCH_INDEX_TTL]
+        if types:
+            query += f" AND type IN ({', '.join('?' * len(types))})"
+            params.extend(types)
+        if projects:
+            query += f" AND project_id IN ({', '.join('?' * len(projects))})"
+            params.extend(projects)
+        query += " ORDER BY name_lower LIKE ? ESCAPE '\\' DESC, name_lower LIMIT ?"
+        params.extend([f"{_escape_like(term)}%", limit or SEARCH_PAGE_SIZE])
+        try:
+            rows = self._connect().execute(query, params).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"Error searching BigQuery search index: {e}")
+            return []
+        return [
+            {
+                "dataplexEntry": {
+                    "fullyQualifiedName": fqn,
+                    "entrySource": {"displayName": name, "system": "BIGQUERY"},
+                }
+            }
+            for fqn, name in rows
+        ]
+
+
+search_index = SearchIndex()
@@ -11,11 +11,237 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import aiohttp
+import asyncio
+import codecs
+import collections
+import json
+import os
 import subprocess
 import sys
+import time
+import uuid
+
+import aiohttp
+from jupyter_core.paths import jupyter_data_dir
 from jupyter_server.base.handlers import APIHandler
 
+from dataproc_jupyter_plugin.commons.constants import (
+    PACKAGE_NAME,
+    UPGRADE_JOB_HISTORY_LIMIT,
+    VERSION_CACHE_TTL,
+)
+
+PYPI_URL = "https://pypi.org/pypi"
+
+_MISSING = object()
+_decoder = json.JSONDecoder()
+
+
+def _skip_whitespace(text, pos):
+    while pos < len(text) and text[pos] in " \t\n\r":
+        pos += 1
+    return pos
+
+
+class _TopLevelFieldScanner:
+    """Incrementally scans a JSON object for one of its top-level fields.
+
+    Text is fed in as it arrives; `feed` returns the field's value as soon
+    as it has been read in full, so the rest of the document (e.g. the
+    release history of a PyPI package) never needs to be read or parsed.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self._text = ""
+        self._pos = 0
+        self._started = False
+
+    def feed(self, chunk):
+        """Returns the field value, or `_MISSING` if more text is needed."""
+        self._text += chunk
+        text = self._text
+        pos = _skip_whitespace(text, self._pos)
+        if not self._started:
+            if pos >= len(text):
+                return _MISSING
+            if text[pos] != "{":
+                raise ValueError("Expected a JSON object")
+            self._started = True
+            pos += 1
+        while True:
+            # `pos` is only committed after a complete member has been read.
+            self._pos = pos
+            pos = _skip_whitespace(text, pos)
+            if pos < len(text) and text[pos] == ",":
+                pos = _skip_whitespace(text, pos + 1)
+            if pos >= len(text):
+                return _MISSING
+            if text[pos] == "}":
+                raise KeyError(self.field)
+            try:
+                key, pos = _decoder.raw_decode(text, pos)
+                pos = _skip_whitespace(text, pos)
+                if pos >= len(text):
+                    return _MISSING
+                if text[pos] != ":":
+                    raise ValueError("Expected ':' in JSON object")
+                pos = _skip_whitespace(text, pos + 1)
+                value, pos = _decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                return _MISSING
+            # A number at the very end of the text may still be truncated.
+            if pos >= len(text):
+                return _MISSING
+            if key == self.field:
+                return value
+
+
+class VersionCache:
+    """Latest package versions, kept in memory and persisted to disk.
+
+    Each entry records the version, the ETag PyPI returned for it and when
+    it was last confirmed, so stale entries can be revalidated cheaply.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(
+            jupyter_data_dir(), PACKAGE_NAME, "version_cache.json"
+        )
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            try:
+                with open(self.path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def get(self, package_name):
+        return self._load().get(package_name)
+
+    def put(self, package_name, version, etag):
+        self._load()[package_name] = {
+            "version": version,
+            "etag": etag,
+            "fetched_at": time.time(),
+        }
+        self._save()
+
+    def touch(self, package_name):
+        self._load()[package_name]["fetched_at"] = time.time()
+        self._save()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # The in-memory cache still applies; persisting is best-effort.
+            pass
+
+
+version_cache = VersionCache()
+
+
+async def _read_info_version(response):
+    scanner = _TopLevelFieldScanner("info")
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in response.content.iter_chunked(64 * 1024):
+        info = scanner.feed(decoder.decode(chunk))
+        if info is not _MISSING:
+            return info["version"]
+    info = scanner.feed(decoder.decode(b"", final=True) + " ")
+    if info is _MISSING:
+        raise ValueError("Incomplete response from PyPI")
+    return info["version"]
+
+
+class UpgradeJob:
+    """A `pip install --upgrade` run in the background.
+
+    pip runs in a worker thread (rather than an asyncio subprocess, which the
+    SelectorEventLoop Jupyter uses on Windows does not support) so that the
+    server keeps serving requests; its output is collected line by line.
+    """
+
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+    def __init__(self, package_name):
+        self.id = uuid.uuid4().hex
+        self.package_name = package_name
+        self.command = [sys.executable, "-m", "pip", "install", "--upgrade", package_name]
+        self.status = self.RUNNING
+        self.returncode = None
+        self.output = []
+        self._future = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._future = loop.run_in_executor(None, self._run)
+        self._future.add_done_callback(self._finished)
+        return self
+
+    def _run(self):
+        process = None
+        try:
+            process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                encoding="UTF-8",
+                errors="replace",
+            )
+            for line in process.stdout:
+                self.output.append(line.rstrip("\n"))
+            self.returncode = process.wait()
+        except Exception as e:
+            if process is not None and process.poll() is None:
+                process.kill()
+            self.output.append(str(e))
+            self.returncode = -1
+        self.status = self.SUCCEEDED if self.returncode == 0 else self.FAILED
+
+    def _finished(self, future):
+        # A job cancelled before `_run` finished (e.g. at shutdown) must not
+        # stay RUNNING, or every later upgrade of the package is refused.
+        if self.status != self.RUNNING:
+            return
+        if not future.cancelled() and future.exception() is not None:
+            self.output.append(str(future.exception()))
+        if self.returncode is None:
+            self.returncode = -1
+        self.status = self.FAILED
+
+    async def wait(self):
+        await asyncio.shield(self._future)
+
+    def to_dict(self, offset=0):
+        return {
+            "job_id": self.id,
+            "package_name": self.package_name,
+            "status": self.status,
+            "returncode": self.returncode,
+            "offset": len(self.output),
+            "output": self.output[offset:],
+        }
+
+
+_upgrade_jobs = collections.OrderedDict()
+
+
+def get_upgrade_job(job_id):
+    return _upgrade_jobs.get(job_id)
+
+
 class Client:
 
     def __init__(self, credentials, log, client_session):
@@ -34,28 +260,56 @@ class Client:
 
 
     async def get_latest_version(self, package_name):
+        cached = version_cache.get(package_name)
+        if cached and time.time() - cached["fetched_at"] < VERSION_CACHE_TTL:
+            return cached["version"]
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"https://pypi.org/pypi/{package_name}/json", timeout=3) as response:
-                    response.raise_for_status()
-                    data = await response.json()
-                    return data["info"]["version"]
+            headers = {}
+            if cached and cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            async with self.client_session.get(
+                f"{PYPI_URL}/{package_name}/json",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=3),
+            ) as response:
+                if response.status == 304 and cached:
+                    version_cache.touch(package_name)
+                    return cached["version"]
+                response.raise_for_status()
+                latest_version = await _read_info_version(response)
+                version_cache.put(
+                    package_name, latest_version, response.headers.get("ETag")
+                )
+                return latest_version
 
         except Exception as e:
             self.log.exception("Error fetching jupyter lab version")
+            if cached:
+                return cached["version"]
             return {"error": str(e)}
 
 
-    def upgrade_package(self, package_name):
-        try:
-            print("installing...................")
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "--upgrade", package_name])
-        except subprocess.CalledProcessError as e:
-            self.log.exception(f"Failed to upgrade package: {package_name}")
-            raise e
-
+    def start_upgrade(self, package_name):
+        """Starts upgrading a package, or returns the upgrade already running."""
+        for job in _upgrade_jobs.values():
+            if job.package_name == package_name and job.status == UpgradeJob.RUNNING:
+                return job
+        job = UpgradeJob(package_name).start()
+        _upgrade_jobs[job.id] = job
+        while len(_upgrade_jobs) > UPGRADE_JOB_HISTORY_LIMIT:
+            oldest_id = next(iter(_upgrade_jobs))
+            if _upgrade_jobs[oldest_id].status == UpgradeJob.RUNNING:
+                break
+            del _upgrade_jobs[oldest_id]
+        self.log.info(f"Started upgrade job {job.id} for package: {package_name}")
+        return job
 
     async def updatePlugin(self, package_name):
-        self.upgrade_package(package_name)
-        return {"status": "ok"}
- 
\ No newline at end of file
+        job = self.start_upgrade(package_name)
+        await job.wait()
+        if job.status == UpgradeJob.FAILED:
+            self.log.error(f"Failed to upgrade package: {package_name}")
+            raise subprocess.CalledProcessError(
+                job.returncode, job.command, "\n".join(job.output)
+            )
+        return {"status": "ok", "job_id": job.id}
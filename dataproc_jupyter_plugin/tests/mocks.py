@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import json
+
 import aiohttp
 from google.cloud import jupyter_config
 
@@ -37,6 +40,8 @@ class MockResponse:
         self._json = json
         self._text = text
         self.status = status
+        self.reason = ""
+        self.headers = {}
 
     async def __aenter__(self):
         return self
@@ -50,14 +55,66 @@ class MockResponse:
     async def text(self, encoding=None):
         return self._text or json.dumps(self._json)
 
+    @property
+    def content(self):
+        return MockStreamReader(json.dumps(self._json).encode("utf-8"))
+
+
+class MockStreamReader:
+    def __init__(self, body):
+        self._body = body
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self._body), size):
+            yield self._body[start:start + size]
+
+
+class MockProcess:
+    """An asyncio subprocess that exits with `returncode`, or never if `hang`."""
+
+    def __init__(self, returncode=0, hang=False):
+        self._returncode = returncode
+        self._hang = hang
+        self.returncode = None
+        self.killed = False
+
+    async def communicate(self):
+        if self._hang:
+            await asyncio.Event().wait()
+        self.returncode = self._returncode
+        return b"", b"error" if self._returncode else b""
+
+    def kill(self):
+        self.killed = True
+        self.returncode = -9
+
+    async def wait(self):
+        return self.returncode
+
+
+def mock_create_subprocess(process, calls):
+    async def create_subprocess_shell(cmd, **kwargs):
+        calls.append(cmd)
+        return process
+
+    return create_subprocess_shell
+
 
 class MockClientSession:
+    closed = False
+
+    def __init__(self, *args, **kwargs):
+        return
+
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, *args, **kwargs):
         return
 
+    async def close(self):
+        self.closed = True
+
     def get(self, api_endpoint, headers=None):
         return MockResponse(
             {
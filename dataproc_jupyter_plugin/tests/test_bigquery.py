@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import json
 import pytest
 import aiohttp
@@ -24,7 +25,15 @@ from dataproc_jupyter_plugin import credentials
 from dataproc_jupyter_plugin.tests import mocks
 from dataproc_jupyter_plugin.commons.constants import BQ_PUBLIC_DATASET_PROJECT_ID
 
-from dataproc_jupyter_plugin.services.bigquery import Client
+from dataproc_jupyter_plugin.services import bigquery as bigquery_services
+from dataproc_jupyter_plugin.services.bigquery import (
+    Client,
+    MetadataCache,
+    RowWindowCache,
+    metadata_cache,
+    preview_cache,
+    to_columnar,
+)
 from dataproc_jupyter_plugin.commons.constants import (
     BQ_PUBLIC_DATASET_PROJECT_ID,
     BASE_PROJECT_ID,
@@ -33,6 +42,12 @@ from dataproc_jupyter_plugin.commons.constants import (
     DATAPLEX_SERVICE_NAME
 )
 
+@pytest.fixture(autouse=True)
+def clear_metadata_cache():
+    metadata_cache.invalidate()
+    yield
+    metadata_cache.invalidate()
+
 @pytest.fixture
 def mock_credentials():
     return {
@@ -236,6 +251,124 @@ async def test_preview(monkeypatch, jp_fetch):
     assert payload["headers"]["Authorization"] == f"Bearer mock-token"
 
 
+async def test_preview_selected_fields(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQueryPreview",
+        params={
+            "dataset_id": "d",
+            "max_results": "10",
+            "project_id": "p",
+            "start_index": "0",
+            "table_id": "t",
+            "selected_fields": "name,age",
+        },
+    )
+    payload = json.loads(response.body)
+    assert payload["api_endpoint"].endswith(
+        "/tables/t/data?maxResults=10&startIndex=0&selectedFields=name,age"
+    )
+
+
+async def test_preview_columnar(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    metadata_cache.put(
+        MetadataCache.key("table_info", "p", dataset_id="d", table_id="t"),
+        {
+            "schema": {
+                "fields": [
+                    {"name": "name", "type": "STRING", "mode": "NULLABLE"},
+                    {"name": "age", "type": "INTEGER", "mode": "NULLABLE"},
+                ]
+            }
+        },
+    )
+    rows = [{"f": [{"v": str(i)}]} for i in range(200)]
+    monkeypatch.setattr(
+        Client,
+        "bigquery_preview_data",
+        AsyncMock(return_value={"totalRows": "200", "rows": rows}),
+    )
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQueryPreview",
+        params={
+            "dataset_id": "d",
+            "max_results": "200",
+            "project_id": "p",
+            "start_index": "0",
+            "table_id": "t",
+            "selected_fields": "age",
+            "format": "columnar",
+        },
+        headers={"Accept-Encoding": "gzip"},
+    )
+    payload = json.loads(response.body)
+    assert payload["schema"] == [{"name": "age", "type": "INTEGER", "mode": "NULLABLE"}]
+    assert payload["columns"] == [[str(i) for i in range(200)]]
+    assert payload["totalRows"] == "200"
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+
+def test_to_columnar_nested_and_repeated():
+    schema = [
+        {"name": "id", "type": "INTEGER", "mode": "NULLABLE"},
+        {"name": "tags", "type": "STRING", "mode": "REPEATED"},
+        {
+            "name": "address",
+            "type": "RECORD",
+            "mode": "NULLABLE",
+            "fields": [{"name": "city", "type": "STRING", "mode": "NULLABLE"}],
+        },
+    ]
+    preview = {
+        "totalRows": "2",
+        "rows": [
+            {"f": [{"v": "1"}, {"v": [{"v": "a"}, {"v": "b"}]}, {"v": {"f": [{"v": "Paris"}]}}]},
+            {"f": [{"v": "2"}, {"v": []}, {"v": None}]},
+        ],
+    }
+    columnar = to_columnar(preview, schema)
+    assert columnar["columns"] == [
+        ["1", "2"],
+        [["a", "b"], []],
+        [{"city": "Paris"}, None],
+    ]
+    assert columnar["schema"][2]["fields"] == [
+        {"name": "city", "type": "STRING", "mode": "NULLABLE"}
+    ]
+
+
+def test_to_columnar_selected_subfields():
+    schema = [
+        {"name": "a", "type": "STRING", "mode": "NULLABLE"},
+        {"name": "b", "type": "STRING", "mode": "NULLABLE"},
+        {
+            "name": "e",
+            "type": "RECORD",
+            "mode": "NULLABLE",
+            "fields": [
+                {"name": "c", "type": "STRING", "mode": "NULLABLE"},
+                {"name": "d", "type": "STRING", "mode": "NULLABLE"},
+            ],
+        },
+        {"name": "z", "type": "STRING", "mode": "NULLABLE"},
+    ]
+    preview = {
+        "totalRows": "1",
+        "rows": [{"f": [{"v": "a1"}, {"v": {"f": [{"v": "d1"}]}}, {"v": "z1"}]}],
+    }
+    columnar = to_columnar(preview, schema, "a, e.d,z")
+    assert [field["name"] for field in columnar["schema"]] == ["a", "e", "z"]
+    assert columnar["schema"][1]["fields"] == [
+        {"name": "d", "type": "STRING", "mode": "NULLABLE"}
+    ]
+    assert columnar["columns"] == [["a1"], [{"d": "d1"}], ["z1"]]
+
+
 async def test_projects_list(monkeypatch, jp_fetch):
     mocks.patch_mocks(monkeypatch)
 
@@ -245,4 +378,497 @@ async def test_projects_list(monkeypatch, jp_fetch):
     )
     assert response.code == 200
     payload = json.loads(response.body)
-    assert payload == ["bigquery-public-data", "credentials-project"]
\ No newline at end of file
+    assert payload == ["bigquery-public-data", "credentials-project"]
+
+@pytest.mark.asyncio
+async def test_service_urls_memoized(
+    mock_credentials, mock_log, mock_client_session, mock_gcp_urls
+):
+    mock_response = AsyncMock()
+    mock_response.status = 200
+    mock_response.json.return_value = {}
+    mock_client_session.get.return_value.__aenter__.return_value = mock_response
+
+    client = Client(mock_credentials, mock_log, mock_client_session)
+    await client.resolve_service_urls()
+    resolved = mock_gcp_urls.call_count
+    await client.list_dataset_info("dataset", "project")
+    await client.list_table_info("dataset", "table", "project")
+    assert mock_gcp_urls.call_count == resolved
+
+    await client.resolve_service_urls(refresh=True)
+    assert mock_gcp_urls.call_count == 2 * resolved
+
+
+@pytest.mark.asyncio
+async def test_get_client_swaps_token_without_new_session(
+    monkeypatch, mock_log, mock_gcp_urls
+):
+    from dataproc_jupyter_plugin.controllers.bigquery import BigQueryClient
+
+    cached = {
+        "access_token": "token-1",
+        "project_id": "mock-project-id",
+        "region_id": "us-central1",
+    }
+    monkeypatch.setattr(credentials, "get_cached", AsyncMock(side_effect=lambda: dict(cached)))
+    monkeypatch.setattr(aiohttp, "ClientSession", mocks.MockClientSession)
+    monkeypatch.setattr(aiohttp, "TCPConnector", Mock())
+
+    bq_client = BigQueryClient()
+    client = await bq_client.get_client(mock_log)
+    session = client.client_session
+    assert client.create_headers()["Authorization"] == "Bearer token-1"
+
+    cached["access_token"] = "token-2"
+    refreshed = await bq_client.get_client(mock_log)
+    assert refreshed is client
+    assert refreshed.client_session is session
+    assert refreshed.create_headers()["Authorization"] == "Bearer token-2"
+
+
+@pytest.mark.asyncio
+async def test_get_client_rejects_failed_login(monkeypatch, mock_log, mock_gcp_urls):
+    from dataproc_jupyter_plugin.controllers.bigquery import BigQueryClient
+
+    cached = {
+        "access_token": "token-1",
+        "project_id": "mock-project-id",
+        "region_id": "us-central1",
+        "login_error": 0,
+    }
+    monkeypatch.setattr(credentials, "get_cached", AsyncMock(side_effect=lambda: dict(cached)))
+    monkeypatch.setattr(aiohttp, "ClientSession", mocks.MockClientSession)
+    monkeypatch.setattr(aiohttp, "TCPConnector", Mock())
+
+    bq_client = BigQueryClient()
+    client = await bq_client.get_client(mock_log)
+
+    cached.update(access_token="", login_error=1)
+    with pytest.raises(ValueError):
+        await bq_client.get_client(mock_log)
+    # The working token is kept rather than replaced by the failed login's.
+    assert client.create_headers()["Authorization"] == "Bearer token-1"
+
+    cached.update(access_token="token-2", login_error=0)
+    assert (await bq_client.get_client(mock_log)) is client
+    assert client.create_headers()["Authorization"] == "Bearer token-2"
+
+
+@pytest.mark.asyncio
+async def test_search_pages_stops_at_max_results(
+    mock_credentials, mock_log, mock_client_session, mock_gcp_urls
+):
+    pages = [
+        {"results": [1, 2, 3], "nextPageToken": "page-2"},
+        {"results": [4, 5, 6], "nextPageToken": "page-3"},
+    ]
+    payloads = []
+
+    def post(api_endpoint, headers=None, json=None):
+        payloads.append(dict(json))
+        return mocks.MockResponse(pages[len(payloads) - 1])
+
+    mock_client_session.post = post
+
+    client = Client(mock_credentials, mock_log, mock_client_session)
+    result = await client.bigquery_search("term", "table", "bigquery", [], max_results=5)
+
+    assert result == {"results": [1, 2, 3, 4, 5]}
+    assert len(payloads) == 2
+    assert payloads[0]["pageSize"] == 5
+    assert payloads[1]["pageSize"] == 2
+    assert payloads[1]["pageToken"] == "page-2"
+
+
+async def test_search_stream(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQuerySearch",
+        method="POST",
+        params={
+            "search_string": "term",
+            "type": "table",
+            "system": "bigquery",
+            "stream": "true",
+        },
+        allow_nonstandard_methods=True,
+    )
+    assert response.code == 200
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    lines = response.body.decode().splitlines()
+    assert len(lines) == 1
+    page = json.loads(lines[0])
+    assert page["results"][0]["json"]["query"].startswith("term AND system=BIGQUERY")
+
+
+async def test_table_info_cached(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    params = {
+        "dataset_id": "mock-dataset-id",
+        "project_id": "mock-project-id",
+        "table_id": "mock-table-id",
+    }
+
+    response = await jp_fetch("dataproc-plugin", "bigQueryTableInfo", params=params)
+    assert response.headers["Cache-Status"] == "dataproc-plugin; fwd=miss"
+    response = await jp_fetch("dataproc-plugin", "bigQueryTableInfo", params=params)
+    assert response.headers["Cache-Status"] == "dataproc-plugin; hit"
+    response = await jp_fetch(
+        "dataproc-plugin", "bigQueryTableInfo", params={**params, "refresh": "true"}
+    )
+    assert response.headers["Cache-Status"] == "dataproc-plugin; fwd=miss"
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQueryCache",
+        method="DELETE",
+        params={"project_id": "mock-project-id"},
+    )
+    assert json.loads(response.body) == {"status": "OK"}
+    response = await jp_fetch("dataproc-plugin", "bigQueryTableInfo", params=params)
+    assert response.headers["Cache-Status"] == "dataproc-plugin; fwd=miss"
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_invalidate():
+    cache = MetadataCache(maxsize=2, ttl=60)
+    key_a = MetadataCache.key("tables", "project-a", dataset_id="d1")
+    key_b = MetadataCache.key("tables", "project-b", dataset_id="d1")
+    cache.put(key_a, {"tables": []})
+    cache.put(key_b, {"tables": []})
+    cache.put(MetadataCache.key("tables", "project-c"), {"error": "failed"})
+    assert cache.get(MetadataCache.key("tables", "project-c")) is None
+
+    cache.invalidate(project_id="project-a")
+    assert cache.get(key_a) is None
+    assert cache.get(key_b) == {"tables": []}
+
+    fetch = AsyncMock(return_value={"tables": ["t"]})
+    assert await cache.get_or_fetch(key_a, fetch) == ({"tables": ["t"]}, False)
+    assert await cache.get_or_fetch(key_a, fetch) == ({"tables": ["t"]}, True)
+    fetch.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_prefetch():
+    cache = MetadataCache(maxsize=10, ttl=60, prefetch_depth=2)
+    responses = {
+        "": {"tables": [1], "nextPageToken": "p2"},
+        "p2": {"tables": [2], "nextPageToken": "p3"},
+        "p3": {"tables": [3], "nextPageToken": "p4"},
+    }
+    fetched = []
+
+    def page(token):
+        async def fetch():
+            fetched.append(token)
+            return responses[token]
+
+        return MetadataCache.key("tables", "project", page_token=token), fetch
+
+    first_key, first_fetch = page("")
+    first, hit = await cache.get_or_fetch(first_key, first_fetch)
+    assert not hit
+    cache.prefetch_pages(first, page)
+
+    # The request for page 2 waits on the in-flight prefetch instead of refetching.
+    second_key, second_fetch = page("p2")
+    assert await cache.get_or_fetch(second_key, second_fetch) == (responses["p2"], True)
+    while cache._pending:
+        await asyncio.gather(*cache._pending.values())
+    assert fetched == ["", "p2", "p3"]
+
+    stats = cache.stats()
+    assert stats["prefetches"] == 2
+    assert stats["prefetch_hits"] == 1
+    assert stats["prefetched_bytes"] > 0
+
+    cache.invalidate(project_id="project")
+    assert cache.stats()["prefetched_bytes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_invalidate_while_waiting_on_prefetch():
+    cache = MetadataCache(maxsize=10, ttl=60, prefetch_depth=1)
+    key = MetadataCache.key("tables", "project", page_token="p2")
+    release = asyncio.Event()
+
+    async def slow_fetch():
+        await release.wait()
+        return {"tables": ["stale"]}
+
+    cache.prefetch_pages({"nextPageToken": "p2"}, lambda token: (key, slow_fetch))
+    fetch = AsyncMock(return_value={"tables": ["fresh"]})
+    waiter = asyncio.ensure_future(cache.get_or_fetch(key, fetch))
+    await asyncio.sleep(0)
+
+    # The waiting request falls back to its own fetch instead of failing.
+    cache.invalidate(project_id="project")
+    assert await waiter == ({"tables": ["fresh"]}, False)
+    fetch.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_prefetch_error_is_refetched():
+    cache = MetadataCache(maxsize=10, ttl=60, prefetch_depth=1)
+    key = MetadataCache.key("tables", "project", page_token="p2")
+    cache.prefetch_pages(
+        {"nextPageToken": "p2"},
+        lambda token: (key, AsyncMock(return_value={"error": "failed"})),
+    )
+    fetch = AsyncMock(return_value={"tables": [2]})
+    assert await cache.get_or_fetch(key, fetch) == ({"tables": [2]}, False)
+    fetch.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_prefetch_memory_budget():
+    cache = MetadataCache(maxsize=10, ttl=60, prefetch_depth=5, prefetch_memory_budget=1)
+    fetch = AsyncMock(return_value={"tables": [1], "nextPageToken": "next"})
+
+    cache.prefetch_pages(
+        {"nextPageToken": "p2"},
+        lambda token: (MetadataCache.key("tables", "project", page_token=token), fetch),
+    )
+    await asyncio.gather(*cache._pending.values())
+    # The first prefetched page uses up the budget, so the chain stops there.
+    assert not cache._pending
+    fetch.assert_called_once()
+
+
+def _rows(start, end):
+    return [{"f": [{"v": str(i)}]} for i in range(start, end)]
+
+
+def test_row_window_cache_merges_windows():
+    cache = RowWindowCache(max_tables=2, max_rows_per_table=100)
+    key = RowWindowCache.key("p", "d", "t")
+    cache.put(key, "1", 0, {"totalRows": "50", "rows": _rows(0, 10)})
+    cache.put(key, "1", 20, {"totalRows": "50", "rows": _rows(20, 30)})
+    assert cache.get(key, "1", 5, 10) is None
+
+    # Filling the gap merges the three ranges into one window.
+    cache.put(key, "1", 10, {"totalRows": "50", "rows": _rows(10, 20)})
+    assert cache.get(key, "1", 5, 20)["rows"] == _rows(5, 25)
+    assert cache.stats()["rows"] == 30
+
+    # A range running past the end of the table is served up to the last row.
+    cache.put(key, "1", 30, {"totalRows": "50", "rows": _rows(30, 50)})
+    assert cache.get(key, "1", 40, 25)["rows"] == _rows(40, 50)
+
+    # A new lastModifiedTime drops everything cached for the table.
+    assert cache.get(key, "2", 0, 10) is None
+    cache.put(key, "2", 0, {"totalRows": "5", "rows": _rows(0, 5)})
+    assert cache.stats()["rows"] == 5
+
+
+def test_row_window_cache_bounded():
+    cache = RowWindowCache(max_tables=1, max_rows_per_table=20)
+    key = RowWindowCache.key("p", "d", "t")
+    cache.put(key, "1", 0, {"totalRows": "100", "rows": _rows(0, 10)})
+    cache.put(key, "1", 50, {"totalRows": "100", "rows": _rows(50, 60)})
+    cache.put(key, "1", 80, {"totalRows": "100", "rows": _rows(80, 90)})
+    # The window furthest from the latest one is dropped.
+    assert cache.get(key, "1", 0, 10) is None
+    assert cache.get(key, "1", 50, 10)["rows"] == _rows(50, 60)
+
+    cache.put(RowWindowCache.key("p", "d", "other"), "1", 0, {"totalRows": "1", "rows": _rows(0, 1)})
+    assert cache.get(key, "1", 80, 10) is None
+    assert cache.stats()["tables"] == 1
+
+
+async def test_preview_served_from_row_cache(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    preview_cache.invalidate()
+    metadata_cache.put(
+        MetadataCache.key("table_info", "p", dataset_id="d", table_id="t"),
+        {"lastModifiedTime": "1700000000000"},
+    )
+    fetch = AsyncMock(return_value={"totalRows": "100", "rows": _rows(0, 20)})
+    monkeypatch.setattr(Client, "_fetch_preview_data", fetch)
+    params = {"dataset_id": "d", "project_id": "p", "table_id": "t"}
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQueryPreview",
+        params={**params, "max_results": "20", "start_index": "0"},
+    )
+    assert json.loads(response.body)["rows"] == _rows(0, 20)
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQueryPreview",
+        params={**params, "max_results": "10", "start_index": "10"},
+    )
+    payload = json.loads(response.body)
+    assert payload["rows"] == _rows(10, 20)
+    assert payload["totalRows"] == "100"
+    fetch.assert_called_once()
+    preview_cache.invalidate()
+    metadata_cache.invalidate(project_id="p")
+
+
+async def test_table_info_passthrough(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    monkeypatch.setattr(bigquery_services, "STREAM_CHUNK_SIZE", 16)
+    params = {
+        "dataset_id": "mock-dataset-id",
+        "project_id": "mock-project-id",
+        "table_id": "mock-table-id",
+        "passthrough": "true",
+    }
+
+    for headers in ({}, {"Accept-Encoding": "gzip"}):
+        response = await jp_fetch(
+            "dataproc-plugin", "bigQueryTableInfo", params=params, headers=headers
+        )
+        payload = json.loads(response.body)
+        assert payload["api_endpoint"].endswith(
+            "/projects/mock-project-id/datasets/mock-dataset-id/tables/mock-table-id"
+        )
+        assert "Cache-Status" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+
+async def test_preview_passthrough_error(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    not_found = mocks.MockResponse({}, status=404, text="Not found")
+    not_found.reason = "Not Found"
+    monkeypatch.setattr(
+        mocks.MockClientSession,
+        "get",
+        lambda self, api_endpoint, headers=None: not_found,
+    )
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQueryPreview",
+        params={
+            "dataset_id": "d",
+            "max_results": "10",
+            "project_id": "p",
+            "start_index": "0",
+            "table_id": "t",
+            "passthrough": "true",
+        },
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert json.loads(response.body) == {
+        "error": "Error displaying BigQuery preview data: Not Found Not found"
+    }
+
+
+async def test_bulk_table_info(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    metadata_cache.invalidate(project_id="bulk-project")
+    failing = {"error": "Error listing BigQuery table info: Not Found"}
+
+    async def list_table_info(self, dataset_id, table_id, project_id):
+        if table_id == "missing":
+            return failing
+        return {"id": f"{project_id}:{dataset_id}.{table_id}"}
+
+    monkeypatch.setattr(Client, "list_table_info", list_table_info)
+    tables = [
+        {"project_id": "bulk-project", "dataset_id": "d", "table_id": f"t{i}"}
+        for i in range(20)
+    ]
+    tables.append({"project_id": "bulk-project", "dataset_id": "d", "table_id": "missing"})
+    tables.append({"project_id": "bulk-project", "dataset_id": "d"})
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQueryTableInfoBulk",
+        method="POST",
+        body=json.dumps({"tables": tables}),
+    )
+    results = json.loads(response.body)["tables"]
+    assert len(results) == 22
+    assert results[3] == {
+        "project_id": "bulk-project",
+        "dataset_id": "d",
+        "table_id": "t3",
+        "info": {"id": "bulk-project:d.t3"},
+    }
+    assert results[20]["error"] == failing["error"]
+    assert "required" in results[21]["error"]
+    metadata_cache.invalidate(project_id="bulk-project")
+
+
+@pytest.mark.asyncio
+async def test_identical_gets_coalesced(mock_credentials, mock_log):
+    release = asyncio.Event()
+    calls = []
+
+    class SlowResponse(mocks.MockResponse):
+        async def json(self):
+            await release.wait()
+            return await super().json()
+
+    session = Mock()
+    session.get = lambda api_endpoint, headers=None: (
+        calls.append(api_endpoint) or SlowResponse({"id": api_endpoint})
+    )
+    client = Client(mock_credentials, mock_log, session)
+    client._service_urls[BIGQUERY_SERVICE_NAME] = "https://bigquery.example.com/"
+
+    waiters = [
+        asyncio.ensure_future(client.list_table_info("d", "t", "p")) for _ in range(3)
+    ]
+    other = asyncio.ensure_future(client.list_table_info("d", "other", "p"))
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, other)
+
+    assert len(calls) == 2
+    assert results[0] == results[1] == results[2]
+    assert client.stats() == {"upstream_calls": 2, "coalesced_calls": 2}
+
+    # Once the call completes, the next identical GET goes upstream again.
+    await client.list_table_info("d", "t", "p")
+    assert len(calls) == 3
+
+
+async def test_all_datasets_cursor(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    pages = {
+        (BQ_PUBLIC_DATASET_PROJECT_ID, ""): {"datasets": [{"id": "a"}], "nextPageToken": "a2"},
+        (BQ_PUBLIC_DATASET_PROJECT_ID, "a2"): {"datasets": [{"id": "b"}]},
+        ("credentials-project", ""): {"entries": [{"fullyQualifiedName": "bigquery:credentials-project.c"}], "nextPageToken": "c2"},
+        ("credentials-project", "c2"): {"error": "failed"},
+    }
+
+    async def list_datasets(self, page_token, project_id, location):
+        return pages[(project_id, page_token)]
+
+    monkeypatch.setattr(Client, "list_datasets", list_datasets)
+
+    response = await jp_fetch("dataproc-plugin", "bigQueryAllDatasets")
+    payload = json.loads(response.body)
+    assert payload["projects"] == {
+        BQ_PUBLIC_DATASET_PROJECT_ID: {"datasets": [{"id": "a"}], "nextPageToken": "a2"},
+        "credentials-project": {"entries": [{"fullyQualifiedName": "bigquery:credentials-project.c"}], "nextPageToken": "c2"},
+    }
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQueryAllDatasets",
+        params={"cursor": payload["nextCursor"]},
+    )
+    payload = json.loads(response.body)
+    assert payload == {
+        "projects": {
+            BQ_PUBLIC_DATASET_PROJECT_ID: {"datasets": [{"id": "b"}]},
+            "credentials-project": {"error": "failed"},
+        }
+    }
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQueryAllDatasets",
+        params={"cursor": "not-a-cursor"},
+        raise_error=False,
+    )
+    assert response.code == 400
@@ -2,11 +2,22 @@ import json
 from unittest.mock import AsyncMock
 from urllib.parse import urlencode
 
+import pytest
+
+from dataproc_jupyter_plugin.controllers import checkApiEnabled
+
+
+@pytest.fixture(autouse=True)
+def clear_enabled_services_cache():
+    checkApiEnabled.clear_cache()
+    yield
+    checkApiEnabled.clear_cache()
+
 
 async def test_check_api_controller_success_enabled(jp_fetch, monkeypatch):
     """Test successful API check when service is enabled."""
     mock_run_gcloud = AsyncMock(return_value="dataproc.googleapis.com\n")
-    mock_gcp_project = AsyncMock(return_value="my-project-123")
+    mock_get_cached = AsyncMock(return_value={"project_id": "my-project-123"})
     mock_dataproc_url = AsyncMock(return_value="https://dataproc.googleapis.com/")
 
     monkeypatch.setattr(
@@ -14,7 +25,7 @@ async def test_check_api_controller_success_enabled(jp_fetch, monkeypatch):
         mock_run_gcloud,
     )
     monkeypatch.setattr(
-        "dataproc_jupyter_plugin.handlers.credentials._gcp_project", mock_gcp_project
+        "dataproc_jupyter_plugin.credentials.get_cached", mock_get_cached
     )
     monkeypatch.setattr(
         "dataproc_jupyter_plugin.urls.gcp_service_url", mock_dataproc_url
@@ -34,15 +45,15 @@ async def test_check_api_controller_success_enabled(jp_fetch, monkeypatch):
     payload = json.loads(response.body)
     assert payload == {"success": True, "is_enabled": True}
 
-    expected_cmd = 'services list --enabled --project=my-project-123 --filter="NAME=dataproc.googleapis.com"'
+    expected_cmd = 'services list --enabled --project=my-project-123 --format="value(config.name)"'
     mock_run_gcloud.assert_called_once_with(expected_cmd)
-    mock_gcp_project.assert_called_once()
+    mock_get_cached.assert_called_once()
 
 
 async def test_check_api_controller_success_disabled(jp_fetch, monkeypatch):
     """Test successful API check when service is disabled."""
     mock_run_gcloud = AsyncMock(return_value="")
-    mock_gcp_project = AsyncMock(return_value="my-project-123")
+    mock_get_cached = AsyncMock(return_value={"project_id": "my-project-123"})
     mock_dataproc_url = AsyncMock(return_value="https://storage.googleapis.com/")
 
     monkeypatch.setattr(
@@ -50,7 +61,7 @@ async def test_check_api_controller_success_disabled(jp_fetch, monkeypatch):
         mock_run_gcloud,
     )
     monkeypatch.setattr(
-        "dataproc_jupyter_plugin.handlers.credentials._gcp_project", mock_gcp_project
+        "dataproc_jupyter_plugin.credentials.get_cached", mock_get_cached
     )
     monkeypatch.setattr(
         "dataproc_jupyter_plugin.urls.gcp_service_url", mock_dataproc_url
@@ -70,5 +81,57 @@ async def test_check_api_controller_success_disabled(jp_fetch, monkeypatch):
     payload = json.loads(response.body)
     assert payload == {"success": True, "is_enabled": False}
 
-    expected_cmd = 'services list --enabled --project=my-project-123 --filter="NAME=storage.googleapis.com"'
+    expected_cmd = 'services list --enabled --project=my-project-123 --format="value(config.name)"'
     mock_run_gcloud.assert_called_once_with(expected_cmd)
+
+
+async def test_check_apis_controller_single_gcloud_call(jp_fetch, monkeypatch):
+    """Test that several services are checked with one cached gcloud call."""
+    mock_run_gcloud = AsyncMock(
+        return_value="bigquery.googleapis.com\ndataproc.googleapis.com\n"
+    )
+    mock_get_cached = AsyncMock(return_value={"project_id": "my-project-123"})
+
+    async def mock_service_url(service_name):
+        return f"https://{service_name}.googleapis.com/"
+
+    monkeypatch.setattr(
+        "dataproc_jupyter_plugin.controllers.checkApiEnabled.async_run_gcloud_subcommand",
+        mock_run_gcloud,
+    )
+    monkeypatch.setattr(
+        "dataproc_jupyter_plugin.credentials.get_cached", mock_get_cached
+    )
+    monkeypatch.setattr(
+        "dataproc_jupyter_plugin.urls.gcp_service_url", mock_service_url
+    )
+
+    body = urlencode({"service_names": "dataproc,bigquery,metastore"})
+    for _ in range(2):
+        response = await jp_fetch(
+            "dataproc-plugin",
+            "checkApisEnabled",
+            method="POST",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            body=body,
+        )
+        assert response.code == 200
+        payload = json.loads(response.body)
+        assert payload == {
+            "success": True,
+            "services": {"dataproc": True, "bigquery": True, "metastore": False},
+        }
+
+    body = urlencode({"service_name": "bigquery"})
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "checkApiEnabled",
+        method="POST",
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        body=body,
+    )
+    assert json.loads(response.body) == {"success": True, "is_enabled": True}
+
+    mock_run_gcloud.assert_called_once_with(
+        'services list --enabled --project=my-project-123 --format="value(config.name)"'
+    )
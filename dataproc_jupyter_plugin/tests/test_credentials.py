@@ -12,12 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import datetime
 import os
 import unittest
+from unittest import mock
 
 from google.cloud.jupyter_config.config import clear_gcloud_cache
 
 from dataproc_jupyter_plugin import credentials
+from dataproc_jupyter_plugin.tests import mocks
 
 
 class TestGetCached(unittest.IsolatedAsyncioTestCase):
@@ -35,6 +39,7 @@ class TestGetCached(unittest.IsolatedAsyncioTestCase):
         for key in self._mock_cloudsdk_variables:
             os.environ[key] = self._mock_cloudsdk_variables[key]
         clear_gcloud_cache()
+        credentials.invalidate_cached()
         return
 
     def tearDown(self):
@@ -43,6 +48,7 @@ class TestGetCached(unittest.IsolatedAsyncioTestCase):
         for key in self.original_cloudsdk_variables:
             os.environ[key] = self.original_cloudsdk_variables[key]
         clear_gcloud_cache()
+        credentials.invalidate_cached()
         return
 
     async def test_get_cached(self):
@@ -51,3 +57,121 @@ class TestGetCached(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(cached["access_token"], "example-token")
         self.assertEqual(cached["region_id"], "example-region")
         self.assertEqual(cached["login_error"], 0)
+
+
+class TestCredentialsProvider(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.config = {
+            "configuration.properties.core.project": "example-project",
+            "configuration.properties.dataproc.region": "example-region",
+            "credential.access_token": "example-token",
+            "credential.token_expiry": self._expiry_in(60 * 60),
+        }
+        self.gcloud_calls = 0
+        patcher = mock.patch.object(
+            credentials, "async_get_gcloud_config", self._mock_config
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.provider = credentials.CredentialsProvider()
+
+    @staticmethod
+    def _expiry_in(seconds):
+        expiry = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+            seconds=seconds
+        )
+        return expiry.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    async def _mock_config(self, field):
+        self.gcloud_calls += 1
+        await asyncio.sleep(0)
+        return self.config.get(field, "")
+
+    async def test_caches_result(self):
+        first = await self.provider.get()
+        calls = self.gcloud_calls
+        second = await self.provider.get()
+        self.assertEqual(first, second)
+        self.assertEqual(second["access_token"], "example-token")
+        self.assertEqual(self.gcloud_calls, calls)
+        self.assertEqual(
+            self.provider.stats(), {"hits": 1, "misses": 1, "refreshes": 1}
+        )
+
+    async def test_concurrent_callers_share_refresh(self):
+        results = await asyncio.gather(*[self.provider.get() for _ in range(10)])
+        self.assertTrue(all(r["project_id"] == "example-project" for r in results))
+        self.assertEqual(self.provider.refreshes, 1)
+        self.assertEqual(self.provider.misses, 10)
+
+    async def test_expiring_token_is_not_served(self):
+        self.config["credential.token_expiry"] = self._expiry_in(30)
+        await self.provider.get()
+        await self.provider.get()
+        self.assertEqual(self.provider.refreshes, 2)
+        self.assertEqual(self.provider.hits, 0)
+
+    async def test_refreshes_in_background_before_expiry(self):
+        self.config["credential.token_expiry"] = self._expiry_in(3 * 60)
+        await self.provider.get()
+        self.config["credential.access_token"] = "new-token"
+        cached = await self.provider.get()
+        self.assertEqual(cached["access_token"], "example-token")
+        await self.provider._refresh_task
+        self.assertEqual(self.provider.refreshes, 2)
+        cached = await self.provider.get()
+        self.assertEqual(cached["access_token"], "new-token")
+
+    async def test_login_error_is_not_cached(self):
+        self.config["credential.access_token"] = ""
+        cached = await self.provider.get()
+        self.assertEqual(cached["login_error"], 1)
+        self.config["credential.access_token"] = "example-token"
+        cached = await self.provider.get()
+        self.assertEqual(cached["login_error"], 0)
+        self.assertEqual(self.provider.refreshes, 2)
+
+    async def test_failed_background_refresh_drops_cache(self):
+        self.config["credential.token_expiry"] = self._expiry_in(3 * 60)
+        await self.provider.get()
+        self.config["credential.access_token"] = ""
+        await self.provider.get()
+        await self.provider._refresh_task
+        self.assertIsNone(self.provider._credentials)
+        self.config["credential.access_token"] = "new-token"
+        cached = await self.provider.get()
+        self.assertEqual(cached["access_token"], "new-token")
+        self.assertEqual(cached["login_error"], 0)
+
+    async def test_invalidate(self):
+        await self.provider.get()
+        self.provider.invalidate()
+        await self.provider.get()
+        self.assertEqual(self.provider.refreshes, 2)
+
+
+class TestGcloudLogin(unittest.IsolatedAsyncioTestCase):
+    def _patch_process(self, process):
+        patcher = mock.patch.object(
+            credentials.asyncio,
+            "create_subprocess_shell",
+            mocks.mock_create_subprocess(process, []),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_failure(self):
+        self._patch_process(mocks.MockProcess(returncode=1))
+        login = credentials.GcloudLogin().start()
+        await login.wait()
+        self.assertEqual(login.status, credentials.GcloudLogin.FAILED)
+        self.assertIn("returned non-zero exit status 1", login.error)
+
+    async def test_close_kills_gcloud(self):
+        process = mocks.MockProcess(hang=True)
+        self._patch_process(process)
+        login = credentials.GcloudLogin().start()
+        await asyncio.sleep(0)
+        await login.close()
+        self.assertTrue(process.killed)
+        self.assertEqual(login.to_dict(), {"login": "FAILED", "error": "Login cancelled"})
@@ -0,0 +1,634 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from dataproc_jupyter_plugin import credentials
+from dataproc_jupyter_plugin.commons import retry
+from dataproc_jupyter_plugin.services import dataproc
+from dataproc_jupyter_plugin.services import inventory as inventory_module
+from dataproc_jupyter_plugin.services.dataproc import Client, ResourceWatch, ResourceWatcher
+from dataproc_jupyter_plugin.tests import mocks
+
+
+def cluster(name, state):
+    return {"clusterName": name, "status": {"state": state}}
+
+
+class FakeListings:
+    """Serves successive listings to `ResourceWatch.list_kinds`."""
+
+    def __init__(self, *listings):
+        self.listings = list(listings)
+        self.calls = 0
+
+    async def __call__(self, kinds):
+        self.calls += 1
+        listing = self.listings[min(self.calls, len(self.listings)) - 1]
+        return {kind: listing.get(kind, []) for kind in kinds}
+
+
+@pytest.mark.asyncio
+async def test_watch_publishes_snapshot_then_changes(monkeypatch):
+    listings = FakeListings(
+        {"clusters": [cluster("a", "CREATING"), cluster("b", "RUNNING")]},
+        {"clusters": [cluster("a", "RUNNING")], "jobs": Exception("denied")},
+    )
+    watch = ResourceWatch("p", "r", interval=3600)
+    monkeypatch.setattr(watch, "list_kinds", listings)
+    subscription = watch.subscribe()
+
+    snapshot = await asyncio.wait_for(subscription.get(), 1)
+    assert snapshot["type"] == "snapshot"
+    assert snapshot["resources"]["clusters"] == [
+        cluster("a", "CREATING"),
+        cluster("b", "RUNNING"),
+    ]
+
+    await watch.poll()
+    changes = await subscription.get()
+    assert changes == {
+        "type": "changes",
+        "kind": "clusters",
+        "upserted": [cluster("a", "RUNNING")],
+        "removed": ["b"],
+    }
+    assert await subscription.get() == {"type": "error", "kind": "jobs", "error": "denied"}
+
+    # A late subscriber starts from the current snapshot.
+    late = watch.subscribe()
+    snapshot = await late.get()
+    assert snapshot["resources"]["clusters"] == [cluster("a", "RUNNING")]
+    assert snapshot["errors"] == {"jobs": "denied"}
+
+    # Unchanged listings publish nothing.
+    assert await watch.poll() == []
+
+    watch.unsubscribe(subscription)
+    watch.unsubscribe(late)
+    assert watch._task is None
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_resynced(monkeypatch):
+    monkeypatch.setattr(dataproc, "DATAPROC_WATCH_QUEUE_SIZE", 2)
+    watch = ResourceWatch("p", "r")
+    subscription = dataproc.Subscription(watch)
+    for i in range(3):
+        subscription.push({"type": "changes", "i": i})
+    assert (await subscription.get())["type"] == "snapshot"
+    assert subscription._queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_watcher_shares_watches(monkeypatch):
+    listings = FakeListings({})
+    monkeypatch.setattr(ResourceWatch, "list_kinds", lambda self, kinds: listings(kinds))
+    watcher = ResourceWatcher()
+    first = watcher.subscribe("p", "r")
+    second = watcher.subscribe("p", "r")
+    other = watcher.subscribe("p", "other-region")
+    assert first.watch is second.watch
+    assert other.watch is not first.watch
+
+    await asyncio.wait_for(first.get(), 1)
+    await asyncio.wait_for(second.get(), 1)
+    # One upstream poll per project and region, whatever the subscriber count.
+    assert listings.calls == 2
+    assert watcher.stats()["p/r"]["subscribers"] == 2
+    assert watcher.stats()["p/r"]["polls"] == 1
+
+    watcher.unsubscribe(first)
+    watcher.unsubscribe(second)
+    assert "p/r" not in watcher.stats()
+    await watcher.close()
+    assert watcher.stats() == {}
+
+
+@pytest.mark.asyncio
+async def test_poll_intervals_follow_resource_states(monkeypatch):
+    listings = FakeListings(
+        {"clusters": [cluster("a", "CREATING")]},
+        {"clusters": [cluster("a", "RUNNING")]},
+        {"clusters": [cluster("a", "RUNNING")], "jobs": Exception("denied")},
+    )
+    watch = ResourceWatch("p", "r", interval=10, fast_interval=2, max_interval=30)
+    monkeypatch.setattr(watch, "list_kinds", listings)
+
+    await watch.poll()
+    assert watch.intervals["clusters"] == 2
+    assert watch.intervals["batches"] == 20
+
+    # Settled resources go back to the base interval, then back off.
+    await watch.poll()
+    assert watch.intervals["clusters"] == 10
+    assert watch.intervals["batches"] == 30
+    await watch.poll()
+    assert watch.intervals["clusters"] == 20
+    assert watch.intervals["jobs"] == 10
+
+
+@pytest.mark.asyncio
+async def test_watch_polls_due_kinds_only(monkeypatch):
+    polled = []
+
+    async def list_kinds(kinds):
+        polled.append(sorted(kinds))
+        return {
+            kind: [cluster("a", "STARTING")] if kind == "clusters" else []
+            for kind in kinds
+        }
+
+    watch = ResourceWatch("p", "r", interval=3600, fast_interval=0.01)
+    monkeypatch.setattr(watch, "list_kinds", list_kinds)
+    subscription = watch.subscribe()
+    await asyncio.wait_for(subscription.get(), 1)
+    await asyncio.sleep(0.1)
+    assert polled[0] == sorted(dataproc.RESOURCE_KINDS)
+    assert len(polled) > 2
+    assert all(kinds == ["clusters"] for kinds in polled[1:])
+
+    # refresh() polls the other kinds without waiting for their interval.
+    watch.refresh(["jobs"])
+    await asyncio.sleep(0.05)
+    assert ["jobs"] in polled or ["clusters", "jobs"] in polled
+
+    watch.unsubscribe(subscription)
+    assert watch._task is None
+
+
+@pytest.mark.asyncio
+async def test_list_resources_follows_pages(monkeypatch):
+    mocks.patch_mocks(monkeypatch)
+    pages = [
+        mocks.MockResponse({"batches": [{"name": "b1"}], "nextPageToken": "t2"}),
+        mocks.MockResponse({"batches": [{"name": "b2"}]}),
+    ]
+    endpoints = []
+
+    def get(api_endpoint, headers=None):
+        endpoints.append(api_endpoint)
+        return pages.pop(0)
+
+    session = Mock()
+    session.get = get
+    client = Client(await mocks.mock_credentials(), Mock(), session)
+    batches = await client.list_resources("batches", "p", "r")
+    assert batches == [{"name": "b1"}, {"name": "b2"}]
+    assert endpoints[0] == (
+        "https://dataproc.googleapis.com/v1/projects/p/locations/r/batches"
+        "?orderBy=create_time desc&pageSize=100"
+    )
+    assert endpoints[1].endswith("&pageToken=t2")
+
+
+def test_dataproc_endpoint_labels():
+    assert retry.endpoint_label(
+        "https://dataproc.googleapis.com/v1/projects/p/regions/r/jobs?clusterName=c"
+    ) == "dataproc.googleapis.com/v1/projects/*/regions/*/jobs"
+    assert retry.endpoint_label(
+        "https://dataproc.googleapis.com/v1/projects/p/locations/r/batches/b"
+    ) == "dataproc.googleapis.com/v1/projects/*/locations/*/batches/*"
+
+
+class StopStream(Exception):
+    pass
+
+
+async def test_watch_handler_streams_events(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    listings = FakeListings({"clusters": [cluster("a", "RUNNING")]})
+    monkeypatch.setattr(ResourceWatch, "list_kinds", lambda self, kinds: listings(kinds))
+    received = []
+
+    def on_chunk(chunk):
+        received.append(chunk.decode())
+        if "\n\n" in "".join(received):
+            raise StopStream()
+
+    with pytest.raises(Exception):
+        await jp_fetch(
+            "dataproc-plugin", "dataprocWatch", streaming_callback=on_chunk
+        )
+    event, data = "".join(received).split("\n")[:2]
+    assert event == "event: snapshot"
+    payload = json.loads(data[len("data: "):])
+    assert payload["project_id"] == "credentials-project"
+    assert payload["resources"]["clusters"] == [cluster("a", "RUNNING")]
+
+
+async def test_watch_refresh(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    refreshed = []
+    monkeypatch.setattr(
+        dataproc.watcher, "refresh", lambda *args: refreshed.append(args)
+    )
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "dataprocWatch",
+        method="POST",
+        params={"kind": "clusters"},
+        allow_nonstandard_methods=True,
+    )
+    assert response.code == 204
+    assert refreshed == [("credentials-project", "mock-region", ["clusters"])]
+
+    with pytest.raises(Exception) as e:
+        await jp_fetch(
+            "dataproc-plugin",
+            "dataprocWatch",
+            method="POST",
+            params={"kind": "buckets"},
+            allow_nonstandard_methods=True,
+        )
+    assert e.value.code == 400
+
+
+def batch(batch_id, create_time, state="SUCCEEDED"):
+    return {
+        "name": f"projects/p/locations/r/batches/{batch_id}",
+        "createTime": create_time,
+        "state": state,
+    }
+
+
+def batch_ids(page):
+    return [b["name"].rsplit("/", 1)[1] for b in page["batches"]]
+
+
+class FakeBatchClient:
+    """Answers `BatchStore` listings from a list of upstream batches."""
+
+    def __init__(self, batches):
+        self.batches = batches
+        self.filters = []
+        self.fetched = []
+
+    async def list_resources(self, kind, project_id, region_id, max_items, params=None):
+        filter_expr = (params or {}).get("filter")
+        self.filters.append(filter_expr)
+        batches = self.batches
+        if filter_expr and filter_expr.startswith("create_time >= "):
+            since = dataproc._create_time_key({"createTime": filter_expr.split('"')[1]})
+            batches = [b for b in batches if dataproc._create_time_key(b) >= since]
+        elif filter_expr:
+            batches = [b for b in batches if b["state"] in dataproc.BATCH_ACTIVE_STATES]
+        return list(batches)
+
+    async def get_resource(self, name):
+        self.fetched.append(name)
+        return next(b for b in self.batches if b["name"] == name)
+
+
+@pytest.mark.asyncio
+async def test_batch_store_syncs_incrementally(monkeypatch):
+    client = FakeBatchClient(
+        [
+            batch("old", "2025-01-01T00:00:00Z"),
+            batch("running", "2025-01-02T00:00:00.5Z", "RUNNING"),
+            batch("pending", "2025-01-02T00:00:00Z", "PENDING"),
+        ]
+    )
+    store = dataproc.BatchStore("p", "r")
+    await store.sync(client)
+    assert client.filters == [None]
+    # Sub-second create times sort after whole seconds.
+    assert batch_ids(store.page(10)) == ["running", "pending", "old"]
+
+    # Syncs moments apart reuse the store.
+    await store.sync(client)
+    assert store.syncs == 1
+
+    client.batches = [
+        batch("new", "2025-01-03T00:00:00Z", "PENDING"),
+        batch("old", "2025-01-01T00:00:00Z"),
+        batch("running", "2025-01-02T00:00:00.5Z", "SUCCEEDED"),
+        batch("pending", "2025-01-02T00:00:00Z", "RUNNING"),
+    ]
+    await store.sync(client, force=True)
+    assert client.filters[1:] == [
+        'create_time >= "2025-01-02T00:00:00.5Z"',
+        "state = PENDING OR state = RUNNING OR state = CANCELLING",
+    ]
+    assert client.fetched == ["projects/p/locations/r/batches/running"]
+    page = store.page(10)
+    assert batch_ids(page) == ["new", "running", "pending", "old"]
+    assert [b["state"] for b in page["batches"]] == ["PENDING", "SUCCEEDED", "RUNNING", "SUCCEEDED"]
+
+    # A batch created in the same instant as the newest one is still found.
+    client.batches.append(batch("twin", "2025-01-03T00:00:00Z"))
+    await store.sync(client, force=True)
+    assert batch_ids(store.page(10))[:2] == ["twin", "new"]
+
+    # The whole listing is refetched periodically, dropping deleted batches.
+    monkeypatch.setattr(dataproc, "DATAPROC_BATCH_FULL_SYNC_INTERVAL", 0)
+    client.batches = client.batches[:1]
+    await store.sync(client, force=True)
+    assert list(store.batches) == ["projects/p/locations/r/batches/new"]
+    assert store.full_syncs == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_store_pages():
+    client = FakeBatchClient(
+        [
+            batch(f"b{i}", f"2025-01-0{i}T00:00:00Z", "RUNNING" if i % 2 else "FAILED")
+            for i in range(1, 6)
+        ]
+    )
+    store = dataproc.BatchStore("p", "r")
+    await store.sync(client)
+
+    first = store.page(2)
+    assert batch_ids(first) == ["b5", "b4"]
+    # Batches created since the first page do not shift the next one.
+    client.batches.append(batch("b6", "2025-01-06T00:00:00Z"))
+    await store.sync(client, force=True)
+    assert batch_ids(store.page(1)) == ["b6"]
+    second = store.page(2, first["nextPageToken"])
+    assert batch_ids(second) == ["b3", "b2"]
+    assert batch_ids(store.page(2, second["nextPageToken"])) == ["b1"]
+    assert "nextPageToken" not in store.page(2, second["nextPageToken"])
+
+    assert batch_ids(store.page(10, states=["RUNNING"])) == ["b5", "b3", "b1"]
+    assert batch_ids(store.page(10, search="B2")) == ["b2"]
+    assert batch_ids(store.page(2, ascending=True)) == ["b1", "b2"]
+    with pytest.raises(ValueError):
+        store.page(2, "not-a-token")
+
+
+async def test_batch_list_handler(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    monkeypatch.setattr(dataproc, "batch_stores", dataproc.BatchStores())
+    upstream = FakeBatchClient([batch("b1", "2025-01-01T00:00:00Z", "RUNNING")])
+    monkeypatch.setattr(
+        Client,
+        "list_resources",
+        lambda self, *args, **kwargs: upstream.list_resources(*args, **kwargs),
+    )
+
+    response = await jp_fetch(
+        "dataproc-plugin", "dataprocBatches", params={"state": "RUNNING"}
+    )
+    assert json.loads(response.body) == {
+        "batches": [batch("b1", "2025-01-01T00:00:00Z", "RUNNING")]
+    }
+    stats = json.loads((await jp_fetch("dataproc-plugin", "dataprocWatchStats")).body)
+    assert stats["batches"]["credentials-project/mock-region"]["syncs"] == 1
+
+    for params in ({"pageSize": "0"}, {"orderBy": "state"}, {"pageToken": "bad"}):
+        with pytest.raises(Exception) as e:
+            await jp_fetch("dataproc-plugin", "dataprocBatches", params=params)
+        assert e.value.code == 400
+
+
+@pytest.fixture
+def saved_inventory(monkeypatch, tmp_path):
+    saved = inventory_module.Inventory()
+    saved.configure(True, str(tmp_path / "inventory.json.gz"))
+    monkeypatch.setattr(dataproc, "inventory", saved)
+    return saved
+
+
+@pytest.mark.asyncio
+async def test_inventory_persists(monkeypatch, tmp_path, saved_inventory):
+    monkeypatch.setattr(inventory_module, "DATAPROC_INVENTORY_MAX_LOCATIONS", 2)
+    for region_id in ("r1", "r2", "r3"):
+        saved_inventory.put("p", region_id, {"clusters": [cluster("a", "RUNNING")]})
+    await saved_inventory.close()
+
+    reloaded = inventory_module.Inventory()
+    reloaded.configure(True, saved_inventory.path)
+    # The file is only read by configure(), never while serving.
+    with monkeypatch.context() as m:
+        m.setattr(inventory_module.gzip, "open", Mock(side_effect=AssertionError))
+        assert reloaded.get("p", "r1") is None
+        assert reloaded.get("p", "r3")["resources"] == {
+            "clusters": [cluster("a", "RUNNING")]
+        }
+
+    reloaded.clear()
+    assert not (tmp_path / "inventory.json.gz").exists()
+
+    (tmp_path / "inventory.json.gz").write_bytes(b"not gzip")
+    unreadable = inventory_module.Inventory()
+    unreadable.configure(True, saved_inventory.path)
+    assert unreadable.get("p", "r3") is None
+
+
+@pytest.mark.asyncio
+async def test_watch_starts_from_stale_inventory(monkeypatch, saved_inventory):
+    saved_inventory.put("p", "r", {"clusters": [cluster("a", "RUNNING")]})
+    listings = FakeListings({"clusters": [cluster("a", "STOPPING")]})
+    polled = asyncio.Event()
+
+    async def list_kinds(kinds):
+        await polled.wait()
+        return await listings(kinds)
+
+    watch = ResourceWatch("p", "r")
+    monkeypatch.setattr(watch, "list_kinds", list_kinds)
+    subscription = watch.subscribe()
+
+    # The persisted inventory is served before any upstream call completes.
+    snapshot = await asyncio.wait_for(subscription.get(), 1)
+    assert snapshot["stale"]
+    assert snapshot["saved_at"] is not None
+    assert snapshot["resources"]["clusters"] == [cluster("a", "RUNNING")]
+
+    polled.set()
+    snapshot = await asyncio.wait_for(subscription.get(), 1)
+    assert snapshot["type"] == "snapshot"
+    assert not snapshot["stale"]
+    assert snapshot["resources"]["clusters"] == [cluster("a", "STOPPING")]
+    assert saved_inventory.get("p", "r")["resources"]["clusters"] == [
+        cluster("a", "STOPPING")
+    ]
+    watch.unsubscribe(subscription)
+    await saved_inventory.close()
+
+
+@pytest.mark.asyncio
+async def test_watcher_snapshot_reconciles_in_background(monkeypatch, saved_inventory):
+    listings = FakeListings({"sessionTemplates": [{"name": "t1"}]})
+    monkeypatch.setattr(ResourceWatch, "list_kinds", lambda self, kinds: listings(kinds))
+    watcher = ResourceWatcher()
+
+    # Nothing persisted yet: the first snapshot waits for a poll.
+    snapshot = await watcher.snapshot("p", "r")
+    assert not snapshot["stale"]
+    assert snapshot["resources"]["sessionTemplates"] == [{"name": "t1"}]
+    assert listings.calls == 1
+
+    # Recently saved inventory is served as is.
+    snapshot = await watcher.snapshot("p", "r")
+    assert snapshot["stale"]
+    assert listings.calls == 1
+
+    # Older inventory is served while a poll refreshes it.
+    monkeypatch.setattr(dataproc, "DATAPROC_WATCH_INTERVAL", 0)
+    listings.listings = [{"sessionTemplates": [{"name": "t2"}]}]
+    snapshot = await watcher.snapshot("p", "r")
+    assert snapshot["resources"]["sessionTemplates"] == [{"name": "t1"}]
+    await watcher._reconciling[("p", "r")]
+    assert listings.calls == 2
+    assert saved_inventory.get("p", "r")["resources"]["sessionTemplates"] == [
+        {"name": "t2"}
+    ]
+    await watcher.close()
+
+
+@pytest.mark.asyncio
+async def test_watcher_snapshot_waits_for_subscribed_poll(monkeypatch):
+    listings = FakeListings({"clusters": [cluster("a", "RUNNING")]})
+    release = asyncio.Event()
+
+    async def list_kinds(self, kinds):
+        await release.wait()
+        return await listings(kinds)
+
+    monkeypatch.setattr(ResourceWatch, "list_kinds", list_kinds)
+    watcher = ResourceWatcher()
+    subscription = watcher.subscribe("p", "r")
+    snapshot = asyncio.ensure_future(watcher.snapshot("p", "r"))
+    await asyncio.sleep(0)
+    assert not snapshot.done()
+
+    release.set()
+    assert (await snapshot)["resources"]["clusters"] == [cluster("a", "RUNNING")]
+    # The subscribed watch's own poll served the snapshot.
+    assert listings.calls == 1
+    # Subscribers get one snapshot, with nothing published twice.
+    await asyncio.wait_for(subscription.get(), 1)
+    assert subscription._queue.empty()
+    await watcher.close()
+
+
+async def test_inventory_handler(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    listings = FakeListings({"clusters": [cluster("a", "RUNNING")]})
+    monkeypatch.setattr(ResourceWatch, "list_kinds", lambda self, kinds: listings(kinds))
+    response = await jp_fetch("dataproc-plugin", "dataprocInventory")
+    payload = json.loads(response.body)
+    assert payload["type"] == "snapshot"
+    assert payload["region_id"] == "mock-region"
+    assert payload["resources"]["clusters"] == [cluster("a", "RUNNING")]
+
+
+def job(job_id, state, state_start_time):
+    return {
+        "reference": {"jobId": job_id},
+        "status": {"state": state, "stateStartTime": state_start_time},
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_cluster_jobs_bounded(monkeypatch):
+    monkeypatch.setattr(dataproc, "DATAPROC_JOBS_CONCURRENCY", 2)
+    running = 0
+    peak = 0
+    requested = []
+
+    async def list_resources(self, kind, project_id, region_id, max_items, params):
+        nonlocal running, peak
+        requested.append((kind, max_items, params["clusterName"]))
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if params["clusterName"] == "broken":
+            raise Exception("denied")
+        return [job(f"{params['clusterName']}-job", "DONE", "2025-01-01T00:00:00Z")]
+
+    monkeypatch.setattr(Client, "list_resources", list_resources)
+    client = Client(await mocks.mock_credentials(), Mock(), Mock())
+    results = await client.list_cluster_jobs("p", "r", ["c1", "c2", "c3", "broken"])
+    assert peak == 2
+    assert ("jobs", 500, "c1") in requested
+    assert results["c3"] == [job("c3-job", "DONE", "2025-01-01T00:00:00Z")]
+    assert str(results["broken"]) == "denied"
+
+
+def test_index_jobs():
+    listing = dataproc.index_jobs(
+        {
+            "c1": [
+                job("a", "DONE", "2025-01-01T00:00:00Z"),
+                job("b", "RUNNING", "2025-01-03T00:00:00Z"),
+            ],
+            "c2": [job("c", "RUNNING", "2025-01-02T00:00:00Z")],
+            "c3": Exception("denied"),
+        }
+    )
+    assert [j["reference"]["jobId"] for j in listing["jobs"]] == ["b", "c", "a"]
+    assert listing["byCluster"] == {"c1": ["a", "b"], "c2": ["c"]}
+    assert listing["byState"] == {"DONE": ["a"], "RUNNING": ["b", "c"]}
+    assert listing["errors"] == {"c3": "denied"}
+
+
+async def test_job_list_handler_etag(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+    jobs = {"c1": [job("a", "RUNNING", "2025-01-01T00:00:00Z")]}
+
+    async def list_resources(self, kind, project_id, region_id, max_items=None, params=None):
+        if kind == "clusters":
+            return [cluster(name, "RUNNING") for name in jobs]
+        return jobs[params["clusterName"]]
+
+    monkeypatch.setattr(Client, "list_resources", list_resources)
+    response = await jp_fetch("dataproc-plugin", "dataprocJobs")
+    assert json.loads(response.body)["byCluster"] == {"c1": ["a"]}
+    etag = response.headers["ETag"]
+
+    # An unchanged listing is not sent again.
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "dataprocJobs",
+        headers={"If-None-Match": etag},
+        raise_error=False,
+    )
+    assert response.code == 304
+    assert response.body == b""
+
+    jobs["c1"] = [job("a", "DONE", "2025-01-01T00:01:00Z")]
+    response = await jp_fetch(
+        "dataproc-plugin", "dataprocJobs", headers={"If-None-Match": etag}
+    )
+    assert response.code == 200
+    assert response.headers["ETag"] != etag
+    assert json.loads(response.body)["byState"] == {"DONE": ["a"]}
+
+
+async def test_job_list_handler_errors(monkeypatch, jp_fetch):
+    mocks.patch_mocks(monkeypatch)
+
+    async def list_resources(self, *args, **kwargs):
+        raise Exception("denied")
+
+    monkeypatch.setattr(Client, "list_resources", list_resources)
+    with pytest.raises(Exception) as e:
+        await jp_fetch("dataproc-plugin", "dataprocJobs")
+    assert e.value.code == 500
+
+    async def unconfigured():
+        return {**(await mocks.mock_credentials()), "project_id": ""}
+
+    monkeypatch.setattr(credentials, "get_cached", unconfigured)
+    with pytest.raises(Exception) as e:
+        await jp_fetch("dataproc-plugin", "dataprocJobs")
+    assert e.value.code == 400
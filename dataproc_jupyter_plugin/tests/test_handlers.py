@@ -75,6 +75,21 @@ async def test_post_config_handler_success(jp_fetch, monkeypatch, jp_serverapp,
     mock_run_gcloud = AsyncMock()
     mock_clear_cache = Mock()
     mock_configure_gateway = Mock(return_value=True)
+    mock_metadata_invalidate = Mock()
+    mock_search_index_clear = Mock()
+    mock_batch_stores_invalidate = Mock()
+    monkeypatch.setattr(
+        "dataproc_jupyter_plugin.handlers.metadata_cache.invalidate",
+        mock_metadata_invalidate,
+    )
+    monkeypatch.setattr(
+        "dataproc_jupyter_plugin.handlers.batch_stores.invalidate",
+        mock_batch_stores_invalidate,
+    )
+    monkeypatch.setattr(
+        "dataproc_jupyter_plugin.handlers.search_index.clear",
+        mock_search_index_clear,
+    )
 
     monkeypatch.setattr(
         "dataproc_jupyter_plugin.handlers.async_run_gcloud_subcommand", mock_run_gcloud
@@ -100,6 +115,9 @@ async def test_post_config_handler_success(jp_fetch, monkeypatch, jp_serverapp,
     assert mock_run_gcloud.call_count == len(expected_calls)
     mock_run_gcloud.assert_has_calls(expected_calls, any_order=False)
     assert mock_clear_cache.called
+    mock_metadata_invalidate.assert_called_once_with()
+    mock_search_index_clear.assert_called_once_with()
+    mock_batch_stores_invalidate.assert_called_once_with()
     assert mock_configure_gateway.called
     mock_configure_gateway.assert_called_with(ANY, ANY, config_project_number)
 
@@ -310,3 +328,108 @@ async def test_resource_manager_handler_error(jp_fetch, monkeypatch):
     payload = json.loads(response.body)
     assert payload["status"] == "ERROR"
     assert payload["error"] == "Simulated gcloud error"
+
+
+async def test_service_urls_resolved_once(jp_fetch, monkeypatch):
+    from dataproc_jupyter_plugin import urls
+
+    urls.clear_cache()
+    mock_config = AsyncMock(
+        return_value={"dataproc": "https://dataproc.example.com/"}
+    )
+    monkeypatch.setattr(jupyter_config, "async_get_gcloud_config", mock_config)
+
+    for _ in range(2):
+        response = await jp_fetch("dataproc-plugin", "getGcpServiceUrls")
+        assert response.code == 200
+        payload = json.loads(response.body)
+        assert payload["dataproc_url"] == "https://dataproc.example.com/"
+        assert payload["bigquery_url"] == "https://bigquery.googleapis.com/"
+        assert payload["storage_url"] == "https://storage.googleapis.com/storage/v1/"
+
+    mock_config.assert_called_once_with(
+        "configuration.properties.api_endpoint_overrides"
+    )
+    urls.clear_cache()
+
+
+async def test_service_urls_not_cached_across_clear(monkeypatch):
+    from dataproc_jupyter_plugin import urls
+
+    urls.clear_cache()
+
+    async def read_then_clear(key):
+        # The config changes while the read is in flight.
+        urls.clear_cache()
+        return {"dataproc": "https://old.example.com/"}
+
+    monkeypatch.setattr(jupyter_config, "async_get_gcloud_config", read_then_clear)
+    await urls.map()
+
+    mock_config = AsyncMock(return_value={"dataproc": "https://new.example.com/"})
+    monkeypatch.setattr(jupyter_config, "async_get_gcloud_config", mock_config)
+    url_map = await urls.map()
+    assert url_map["dataproc_url"] == "https://new.example.com/"
+    urls.clear_cache()
+
+
+async def test_login_handler(jp_fetch, monkeypatch):
+    from dataproc_jupyter_plugin import credentials, handlers
+
+    commands = []
+    monkeypatch.setattr(
+        credentials.asyncio,
+        "create_subprocess_shell",
+        mocks.mock_create_subprocess(mocks.MockProcess(), commands),
+    )
+    mock_invalidate = Mock()
+    monkeypatch.setattr(credentials, "invalidate_cached", mock_invalidate)
+    monkeypatch.setattr(credentials, "clear_gcloud_cache", Mock())
+    monkeypatch.setattr(credentials, "login", credentials.GcloudLogin())
+    for name, method in [
+        ("metadata_cache", "invalidate"),
+        ("preview_cache", "invalidate"),
+        ("search_index", "clear"),
+        ("batch_stores", "invalidate"),
+        ("inventory", "clear"),
+    ]:
+        monkeypatch.setattr(f"dataproc_jupyter_plugin.handlers.{name}.{method}", Mock())
+
+    response = await jp_fetch(
+        "dataproc-plugin", "login", method="POST", allow_nonstandard_methods=True
+    )
+    assert json.loads(response.body) == {"login": "SUCCEEDED"}
+    assert commands == ["gcloud auth login"]
+    mock_invalidate.assert_called_once()
+    handlers.metadata_cache.invalidate.assert_called_once_with()
+    handlers.preview_cache.invalidate.assert_called_once_with()
+    handlers.search_index.clear.assert_called_once_with()
+    handlers.batch_stores.invalidate.assert_called_once_with()
+    handlers.inventory.clear.assert_called_once_with()
+
+    response = await jp_fetch("dataproc-plugin", "login")
+    assert json.loads(response.body) == {"login": "SUCCEEDED"}
+
+
+async def test_login_handler_failure(jp_fetch, monkeypatch):
+    from dataproc_jupyter_plugin import credentials
+
+    process = mocks.MockProcess(hang=True)
+    monkeypatch.setattr(
+        credentials.asyncio,
+        "create_subprocess_shell",
+        mocks.mock_create_subprocess(process, []),
+    )
+    monkeypatch.setattr(credentials, "LOGIN_TIMEOUT", 0.01)
+    mock_invalidate = Mock()
+    monkeypatch.setattr(credentials, "invalidate_cached", mock_invalidate)
+    monkeypatch.setattr(credentials, "login", credentials.GcloudLogin())
+
+    response = await jp_fetch(
+        "dataproc-plugin", "login", method="POST", allow_nonstandard_methods=True
+    )
+    payload = json.loads(response.body)
+    assert payload["login"] == "FAILED"
+    assert "timed out" in payload["error"]
+    assert process.killed
+    mock_invalidate.assert_not_called()
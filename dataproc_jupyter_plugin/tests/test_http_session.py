@@ -0,0 +1,42 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from dataproc_jupyter_plugin.commons.http_session import HttpSessionManager
+
+
+@pytest.mark.asyncio
+async def test_session_is_shared_until_closed():
+    manager = HttpSessionManager()
+    manager.configure(pool_size=7, pool_size_per_host=3, request_timeout=10)
+
+    session = manager.get()
+    assert manager.get() is session
+    assert session.connector.limit == 7
+    assert session.connector.limit_per_host == 3
+    assert session.timeout.total == 10
+
+    await manager.close()
+    assert session.closed
+    assert manager.get() is not session
+    await manager.close()
+
+
+async def test_session_closed_on_server_shutdown(jp_serverapp):
+    from dataproc_jupyter_plugin.commons import http_session
+
+    session = http_session.manager.get()
+    await jp_serverapp.cleanup_extensions()
+    assert session.closed
@@ -0,0 +1,139 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import email.utils
+import time
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from dataproc_jupyter_plugin.commons import retry
+from dataproc_jupyter_plugin.commons.retry import RetryableError, RetryPolicy
+from dataproc_jupyter_plugin.services.bigquery import Client
+from dataproc_jupyter_plugin.tests import mocks
+
+URL = "https://bigquery.googleapis.com/bigquery/v2/projects/p/datasets/d"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+
+    async def sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(retry.asyncio, "sleep", sleep)
+    return sleeps
+
+
+def test_parse_retry_after():
+    assert retry.parse_retry_after("3") == 3
+    assert retry.parse_retry_after(None) is None
+    assert retry.parse_retry_after("soon") is None
+    date = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 < retry.parse_retry_after(date) <= 30
+
+
+def test_endpoint_label():
+    assert retry.endpoint_label(f"{URL}/tables/t/data?maxResults=10") == (
+        "bigquery.googleapis.com/bigquery/v2/projects/*/datasets/*/tables/*/data"
+    )
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_retried(sleeps):
+    policy = RetryPolicy(max_attempts=4, base_delay=1, max_delay=5)
+    send = AsyncMock(
+        side_effect=[RetryableError("503"), RetryableError("429", retry_after=2), "ok"]
+    )
+    assert await policy.run(URL, send) == "ok"
+    assert send.call_count == 3
+    assert 0 <= sleeps[0] <= 1
+    assert sleeps[1] == 2
+
+    endpoint = policy.stats()["endpoints"][retry.endpoint_label(URL)]
+    assert endpoint["requests"] == 1
+    assert endpoint["retries"] == 2
+    assert endpoint["failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_retries_bounded(sleeps):
+    policy = RetryPolicy(max_attempts=3, budget_max=10)
+    send = AsyncMock(side_effect=RetryableError("503"))
+    with pytest.raises(RetryableError):
+        await policy.run(URL, send)
+    assert send.call_count == 3
+
+    # A Retry-After longer than the maximum delay is not waited for.
+    send = AsyncMock(side_effect=RetryableError("429", retry_after=3600))
+    with pytest.raises(RetryableError):
+        await policy.run(URL, send)
+    assert send.call_count == 1
+
+    # Other errors are not retried.
+    send = AsyncMock(side_effect=Exception("404"))
+    with pytest.raises(Exception):
+        await policy.run(URL, send)
+    assert send.call_count == 1
+    assert policy.stats()["endpoints"][retry.endpoint_label(URL)]["failures"] == 3
+
+
+@pytest.mark.asyncio
+async def test_retry_budget(sleeps):
+    policy = RetryPolicy(max_attempts=10, budget_max=2, budget_ratio=0.5)
+    send = AsyncMock(side_effect=RetryableError("503"))
+    with pytest.raises(RetryableError):
+        await policy.run(URL, send)
+    # The budget held two retries; the first attempt's refill was capped.
+    assert send.call_count == 3
+
+    # One more request earns half a retry, which is not enough to retry.
+    send.reset_mock()
+    with pytest.raises(RetryableError):
+        await policy.run(URL, send)
+    assert send.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_token_bucket(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(retry.time, "monotonic", lambda: now[0])
+
+    async def sleep(delay):
+        now[0] += delay
+
+    monkeypatch.setattr(retry.asyncio, "sleep", sleep)
+    bucket = retry.TokenBucket(rate=10, capacity=2)
+    for _ in range(4):
+        await bucket.acquire()
+    # Two tokens were available at once; the next two waited 0.1s each.
+    assert now[0] == pytest.approx(0.2)
+
+
+@pytest.mark.asyncio
+async def test_client_retries_rate_limited_requests(monkeypatch, sleeps):
+    monkeypatch.setattr(retry, "policy", RetryPolicy())
+    throttled = mocks.MockResponse({}, status=429, text="Rate limited")
+    throttled.headers = {"Retry-After": "1"}
+    responses = [throttled, mocks.MockResponse({"id": "d"})]
+    session = Mock()
+    session.get = lambda api_endpoint, headers=None: responses.pop(0)
+    client = Client(
+        {"access_token": "t", "project_id": "p", "region_id": "r"}, Mock(), session
+    )
+    client._service_urls["bigquery"] = "https://bigquery.googleapis.com/"
+
+    assert await client.list_dataset_info("d", "p") == {"id": "d"}
+    assert sleeps == [1]
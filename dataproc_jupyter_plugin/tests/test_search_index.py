@@ -0,0 +1,193 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import pytest
+
+from dataproc_jupyter_plugin.services import bigquery
+from dataproc_jupyter_plugin.services import search_index as search_index_module
+from dataproc_jupyter_plugin.services.search_index import SearchIndex
+from dataproc_jupyter_plugin.tests import mocks
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex()
+    index.configure(True, str(tmp_path / "index.sqlite"))
+    index.add_datasets(
+        {
+            "entries": [
+                {"fullyQualifiedName": "bigquery:my-project.sales"},
+                {"fullyQualifiedName": "bigquery:my-project.marketing"},
+            ]
+        }
+    )
+    index.add_datasets(
+        {"datasets": [{"datasetReference": {"projectId": "public", "datasetId": "wholesale"}}]}
+    )
+    index.add_tables(
+        {
+            "tables": [
+                {"tableReference": {"projectId": "my-project", "datasetId": "sales", "tableId": "orders_2024"}},
+                {"tableReference": {"projectId": "my-project", "datasetId": "sales", "tableId": "sales_daily"}},
+            ]
+        }
+    )
+    yield index
+    index.close()
+
+
+def fqns(results):
+    return [r["dataplexEntry"]["fullyQualifiedName"] for r in results]
+
+
+@pytest.mark.asyncio
+async def test_search_prefix_matches_first(index):
+    results = await index.search("sale", "(table|dataset)", ["my-project", "public"])
+    assert fqns(results) == [
+        "bigquery:my-project.sales",
+        "bigquery:my-project.sales.sales_daily",
+        "bigquery:public.wholesale",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_search_filters(index):
+    assert fqns(await index.search("sale", "table", ["my-project"])) == [
+        "bigquery:my-project.sales.sales_daily"
+    ]
+    assert fqns(await index.search("sale", "dataset", ["public"])) == [
+        "bigquery:public.wholesale"
+    ]
+    assert await index.search("order_", "table", []) == []
+    assert len(await index.search("s", "", [], limit=2)) == 2
+
+
+@pytest.mark.asyncio
+async def test_clear(index):
+    index.clear()
+    assert await index.search("sale", "(table|dataset)", []) == []
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_pruned_periodically(index, monkeypatch):
+    later = search_index_module.time.time() + search_index_module.SEARCH_INDEX_TTL + 1
+    monkeypatch.setattr(search_index_module.time, "time", lambda: later)
+    table = {"tables": [{"tableReference": {"projectId": "p", "datasetId": "d", "tableId": "t"}}]}
+
+    def count():
+        return index._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # Expired entries are kept until the prune interval has passed.
+    index._last_pruned = later
+    index.add_tables(table)
+    await index.flush()
+    assert count() == 6
+
+    index._last_pruned = later - search_index_module.SEARCH_INDEX_PRUNE_INTERVAL
+    index.add_tables(table)
+    await index.flush()
+    assert count() == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_index(tmp_path):
+    index = SearchIndex()
+    index.configure(False, str(tmp_path / "index.sqlite"))
+    index.add_datasets({"entries": [{"fullyQualifiedName": "bigquery:p.sales"}]})
+    assert await index.search("sales", "dataset", []) == []
+    await index.flush()
+    assert not (tmp_path / "index.sqlite").exists()
+
+
+async def test_search_merges_index_and_dataplex(monkeypatch, jp_fetch, index):
+    mocks.patch_mocks(monkeypatch)
+    monkeypatch.setattr(
+        "dataproc_jupyter_plugin.controllers.bigquery.search_index", index
+    )
+    monkeypatch.setattr(
+        "dataproc_jupyter_plugin.controllers.bigquery.bq_projects_list",
+        lambda: _projects(["my-project"]),
+    )
+    params = {"search_string": "orders", "type": "(table|dataset)", "system": "bigquery"}
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQuerySearch",
+        method="POST",
+        params={**params, "complete": "true"},
+        allow_nonstandard_methods=True,
+    )
+    # Local matches come first and Dataplex is still searched for the rest.
+    results = json.loads(response.body)["results"]
+    assert fqns(results[:1]) == ["bigquery:my-project.sales.orders_2024"]
+    assert "api_endpoint" in results[1]
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQuerySearch",
+        method="POST",
+        params={**params, "stream": "true"},
+        allow_nonstandard_methods=True,
+    )
+    lines = [json.loads(line) for line in response.body.decode().splitlines()]
+    assert fqns(lines[0]["results"]) == ["bigquery:my-project.sales.orders_2024"]
+    assert "api_endpoint" in lines[1]["results"][0]
+
+
+async def test_search_index_hits_skip_dataplex(monkeypatch, jp_fetch, index):
+    mocks.patch_mocks(monkeypatch)
+    monkeypatch.setattr(
+        "dataproc_jupyter_plugin.controllers.bigquery.search_index", index
+    )
+    monkeypatch.setattr(
+        "dataproc_jupyter_plugin.controllers.bigquery.bq_projects_list",
+        lambda: _projects(["my-project"]),
+    )
+    dataplex_searches = []
+
+    async def bigquery_search(self, *args):
+        dataplex_searches.append(args)
+        return {"results": []}
+
+    monkeypatch.setattr(bigquery.Client, "bigquery_search", bigquery_search)
+    params = {"type": "(table|dataset)", "system": "bigquery"}
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "bigQuerySearch",
+        method="POST",
+        params={**params, "search_string": "orders"},
+        allow_nonstandard_methods=True,
+    )
+    assert json.loads(response.body) == {
+        "results": await index.search("orders", "(table|dataset)", ["my-project"]),
+        "partial": True,
+    }
+    assert dataplex_searches == []
+
+    # A miss falls back to Dataplex.
+    await jp_fetch(
+        "dataproc-plugin",
+        "bigQuerySearch",
+        method="POST",
+        params={**params, "search_string": "inventory"},
+        allow_nonstandard_methods=True,
+    )
+    assert len(dataplex_searches) == 1
+
+
+async def _projects(projects):
+    return projects
@@ -0,0 +1,200 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import collections
+import json
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+from dataproc_jupyter_plugin.services import version
+
+PYPI_DOCUMENT = json.dumps(
+    {
+        "info": {"name": "example", "version": "1.2.3"},
+        "last_serial": 42,
+        "releases": {f"0.0.{i}": [{"url": "x" * 100}] for i in range(100)},
+    }
+)
+
+
+class MockContent:
+    def __init__(self, body, chunk_size):
+        self._body = body.encode("utf-8")
+        self._chunk_size = chunk_size
+        self.bytes_read = 0
+
+    async def iter_chunked(self, n):
+        for i in range(0, len(self._body), self._chunk_size):
+            chunk = self._body[i : i + self._chunk_size]
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
+class MockPypiResponse:
+    def __init__(self, status=200, body=PYPI_DOCUMENT, etag='"etag-1"'):
+        self.status = status
+        self.headers = {"ETag": etag}
+        self.content = MockContent(body, chunk_size=16)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        return
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise Exception(f"HTTP {self.status}")
+
+
+@pytest.fixture
+def version_cache(tmp_path, monkeypatch):
+    cache = version.VersionCache(str(tmp_path / "version_cache.json"))
+    monkeypatch.setattr(version, "version_cache", cache)
+    return cache
+
+
+def make_client(responses):
+    session = Mock()
+    session.get.side_effect = responses
+    credentials = {"access_token": "", "project_id": "", "region_id": ""}
+    return version.Client(credentials, Mock(), session), session
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000000])
+def test_scanner_stops_after_field(chunk_size):
+    document = '{"first": [1, {"a": "}"}], "info" : {"version": "1.0"}, "rest": ['
+    scanner = version._TopLevelFieldScanner("info")
+    result = version._MISSING
+    for i in range(0, len(document), chunk_size):
+        result = scanner.feed(document[i : i + chunk_size])
+        if result is not version._MISSING:
+            break
+    assert result == {"version": "1.0"}
+
+
+def test_scanner_missing_field():
+    scanner = version._TopLevelFieldScanner("info")
+    with pytest.raises(KeyError):
+        scanner.feed('{"other": 1} ')
+
+
+@pytest.mark.asyncio
+async def test_latest_version_streams_only_info(version_cache):
+    response = MockPypiResponse()
+    client, _ = make_client([response])
+
+    assert await client.get_latest_version("example") == "1.2.3"
+    assert response.content.bytes_read < len(PYPI_DOCUMENT) / 10
+    assert version_cache.get("example")["etag"] == '"etag-1"'
+
+
+@pytest.mark.asyncio
+async def test_latest_version_cached_and_revalidated(version_cache, monkeypatch):
+    client, session = make_client(
+        [MockPypiResponse(), MockPypiResponse(status=304, body="")]
+    )
+    assert await client.get_latest_version("example") == "1.2.3"
+    assert await client.get_latest_version("example") == "1.2.3"
+    assert session.get.call_count == 1
+
+    monkeypatch.setattr(version, "VERSION_CACHE_TTL", 0)
+    assert await client.get_latest_version("example") == "1.2.3"
+    assert session.get.call_count == 2
+    assert session.get.call_args.kwargs["headers"] == {"If-None-Match": '"etag-1"'}
+
+    reloaded = version.VersionCache(version_cache.path)
+    assert reloaded.get("example")["version"] == "1.2.3"
+
+
+@pytest.mark.asyncio
+async def test_upgrade_job_collects_output():
+    job = version.UpgradeJob("example")
+    job.command = [sys.executable, "-c", "print('collecting'); print('done')"]
+    await job.start().wait()
+    assert job.status == version.UpgradeJob.SUCCEEDED
+    assert job.to_dict(offset=1)["output"] == ["done"]
+
+
+@pytest.mark.asyncio
+async def test_upgrade_job_failure():
+    job = version.UpgradeJob("example")
+    job.command = [sys.executable, "-c", "import sys; sys.exit(3)"]
+    await job.start().wait()
+    assert job.status == version.UpgradeJob.FAILED
+    assert job.returncode == 3
+
+
+@pytest.mark.asyncio
+async def test_upgrade_job_unexpected_error(monkeypatch):
+    def popen(*args, **kwargs):
+        raise ValueError("bad command")
+
+    monkeypatch.setattr(version.subprocess, "Popen", popen)
+    job = version.UpgradeJob("example")
+    await job.start().wait()
+    assert job.status == version.UpgradeJob.FAILED
+    assert job.returncode == -1
+    assert job.output == ["bad command"]
+
+
+@pytest.mark.asyncio
+async def test_upgrade_job_cancelled():
+    job = version.UpgradeJob("example")
+    job._future = asyncio.get_running_loop().create_future()
+    job._future.add_done_callback(job._finished)
+    job._future.cancel()
+    await asyncio.sleep(0)
+    assert job.status == version.UpgradeJob.FAILED
+    assert job.returncode == -1
+
+
+async def test_update_plugin_status(jp_fetch, monkeypatch):
+    from dataproc_jupyter_plugin.tests import mocks
+
+    mocks.patch_mocks(monkeypatch)
+    # The job never finishes, so keep it out of the module-level job list.
+    monkeypatch.setattr(version, "_upgrade_jobs", collections.OrderedDict())
+    monkeypatch.setattr(version.UpgradeJob, "start", lambda job: job)
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "updatePlugin",
+        method="POST",
+        params={"packageName": "example", "wait": "false"},
+        allow_nonstandard_methods=True,
+    )
+    job = json.loads(response.body)
+    assert job["status"] == version.UpgradeJob.RUNNING
+
+    version.get_upgrade_job(job["job_id"]).output.extend(["a", "b"])
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "updatePlugin",
+        params={"jobId": job["job_id"], "offset": "1"},
+    )
+    payload = json.loads(response.body)
+    assert payload["output"] == ["b"]
+    assert payload["offset"] == 2
+
+    response = await jp_fetch(
+        "dataproc-plugin",
+        "updatePlugin",
+        params={"jobId": "unknown"},
+        raise_error=False,
+    )
+    assert response.code == 404
@@ -11,6 +11,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import time
+
 from google.cloud import jupyter_config
 
 from dataproc_jupyter_plugin.commons.constants import (
@@ -21,37 +23,67 @@ from dataproc_jupyter_plugin.commons.constants import (
     DATAPLEX_SERVICE_NAME,
     DATAPROC_SERVICE_NAME,
     METASTORE_SERVICE_NAME,
+    SERVICE_URL_CACHE_TTL,
     STORAGE_SERVICE_DEFAULT_URL,
     STORAGE_SERVICE_NAME,
     BIGQUERY_SERVICE_NAME
 )
 
+# Keys of the map returned by `map()`, with the service and default URL for each.
+_SERVICES = {
+    "dataproc_url": (DATAPROC_SERVICE_NAME, None),
+    "compute_url": (COMPUTE_SERVICE_NAME, COMPUTE_SERVICE_DEFAULT_URL),
+    "metastore_url": (METASTORE_SERVICE_NAME, None),
+    "cloudkms_url": (CLOUDKMS_SERVICE_NAME, None),
+    "cloudresourcemanager_url": (CLOUDRESOURCEMANAGER_SERVICE_NAME, None),
+    "storage_url": (STORAGE_SERVICE_NAME, STORAGE_SERVICE_DEFAULT_URL),
+    "dataplex_url": (DATAPLEX_SERVICE_NAME, None),
+    "bigquery_url": (BIGQUERY_SERVICE_NAME, None),
+}
+
+_url_map = None
+_url_map_time = 0
+_generation = 0
+
+
+def clear_cache():
+    """Drops the memoized service URL map, e.g. after the gcloud config changes.
+
+    Clients that memoize individual service URLs compare `cache_generation()`
+    against the value they resolved with to know when to resolve them again.
+    """
+    global _url_map, _generation
+    _url_map = None
+    _generation += 1
+
+
+def cache_generation():
+    return _generation
+
 
 async def map():
-    dataproc_url = await gcp_service_url(DATAPROC_SERVICE_NAME)
-    bigquery_url = await gcp_service_url(BIGQUERY_SERVICE_NAME)
-    compute_url = await gcp_service_url(
-        COMPUTE_SERVICE_NAME, default_url=COMPUTE_SERVICE_DEFAULT_URL
-    )
-    metastore_url = await gcp_service_url(METASTORE_SERVICE_NAME)
-    cloudkms_url = await gcp_service_url(CLOUDKMS_SERVICE_NAME)
-    cloudresourcemanager_url = await gcp_service_url(CLOUDRESOURCEMANAGER_SERVICE_NAME)
-    dataplex_url = await gcp_service_url(DATAPLEX_SERVICE_NAME)
-    storage_url = await gcp_service_url(
-        STORAGE_SERVICE_NAME, default_url=STORAGE_SERVICE_DEFAULT_URL
+    global _url_map, _url_map_time
+    if _url_map is not None and time.monotonic() - _url_map_time < SERVICE_URL_CACHE_TTL:
+        return dict(_url_map)
+
+    generation = _generation
+    # All endpoint overrides come from a single gcloud config read.
+    overrides = await jupyter_config.async_get_gcloud_config(
+        "configuration.properties.api_endpoint_overrides"
     )
-    
+    if not isinstance(overrides, dict):
+        overrides = {}
     url_map = {
-        "dataproc_url": dataproc_url,
-        "compute_url": compute_url,
-        "metastore_url": metastore_url,
-        "cloudkms_url": cloudkms_url,
-        "cloudresourcemanager_url": cloudresourcemanager_url,
-        "storage_url": storage_url,
-        "dataplex_url": dataplex_url,
-        "bigquery_url": bigquery_url,
+        key: overrides.get(service_name)
+        or default_url
+        or f"https://{service_name}.googleapis.com/"
+        for key, (service_name, default_url) in _SERVICES.items()
     }
-    return url_map
+    if generation == _generation:
+        # Otherwise the cache was cleared while the config read was in flight.
+        _url_map = url_map
+        _url_map_time = time.monotonic()
+    return dict(url_map)
 
 
 async def gcp_service_url(service_name, default_url=None):